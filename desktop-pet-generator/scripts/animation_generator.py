@@ -6,10 +6,14 @@ Generates unique animation frames for different interaction types using AI image
 import json
 import os
 import sys
-import subprocess
 import time
 from pathlib import Path
-from PIL import Image
+
+from lazy_import import lazy_import
+
+# Imported when frames are generated or assembled, not for --help
+Image = lazy_import('PIL.Image')
+subprocess = lazy_import('subprocess')
 
 # Animation type definitions with descriptions for AI generation
 ANIMATION_TYPES = {
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Asset Publisher for Desktop Pet Generator
+Fans rendered assets out to the extension and desktop app folders as reflinks
+or hardlinks where the filesystem allows, copying otherwise
+"""
+
+import errno
+import json
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+# Linux ioctl that makes dest share src's extents copy-on-write (Btrfs,
+# XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem pair can't do that", as opposed to a
+# problem with the file itself
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EMLINK, errno.ENOSYS}
+
+
+def _reflink(src: Path, dest: Path):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks need fcntl")
+    with open(src, 'rb') as source, open(dest, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            dest.unlink()
+            raise
+
+
+class AssetPublisher:
+    """
+    Places generated files into several output folders without storing them again
+
+    In auto mode each file becomes a reflink (independent copy-on-write
+    file) if the filesystem supports it, else a hardlink, else a copy. A
+    method that fails for a pair of devices is not tried again for it.
+    Hardlinked files share one inode, so writers replace outputs (unlink
+    and write) rather than editing them in place. Safe to share between
+    threads.
+    """
+
+    def __init__(self, mode: str = 'auto'):
+        if mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {mode}")
+        self.mode = mode
+        self.methods = ('reflink', 'hardlink') if mode == 'auto' else () if mode == 'copy' else (mode,)
+        self._unsupported: Set[Tuple[str, int, int]] = set()
+        self._lock = threading.Lock()
+        self.counts = {'reflink': 0, 'hardlink': 0, 'copy': 0}
+        self.bytes_saved = 0
+        self.bytes_copied = 0
+
+    def publish(self, src: Path, dest: Path) -> str:
+        """Make dest a file with src's contents and return how: 'reflink', 'hardlink' or 'copy'"""
+        src, dest = Path(src), Path(dest)
+        # Never write through an existing file: it may be a link to another output
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+
+        size = src.stat().st_size
+        devices = (src.stat().st_dev, dest.parent.stat().st_dev)
+        for method in self.methods:
+            if (method, *devices) in self._unsupported:
+                continue
+            try:
+                if method == 'reflink':
+                    _reflink(src, dest)
+                else:
+                    os.link(src, dest)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                with self._lock:
+                    self._unsupported.add((method, *devices))
+                continue
+            self._count(method, size)
+            return method
+
+        shutil.copyfile(src, dest)
+        self._count('copy', size)
+        return 'copy'
+
+    def _count(self, method: str, size: int):
+        with self._lock:
+            self.counts[method] += 1
+            if method == 'copy':
+                self.bytes_copied += size
+            else:
+                self.bytes_saved += size
+
+    def get_stats(self) -> Dict:
+        """Files published per method and the bytes not stored a second time"""
+        return {**self.counts, "bytes_saved": self.bytes_saved, "bytes_copied": self.bytes_copied}
+
+    def summary(self) -> str:
+        """One-line account of how files were published"""
+        published = sum(self.counts.values())
+        methods = ', '.join(f"{count} {method}" for method, count in self.counts.items() if count)
+        return f"🔗 Assets: {published} published ({methods}), {self.bytes_saved / 1024:.1f} KB saved"
+
+
+def main():
+    """CLI entry point: publish files into a directory and print how"""
+    if len(sys.argv) < 3:
+        print(f"Usage: python asset_publisher.py <dest_dir> <file> [file ...] [--mode {'|'.join(LINK_MODES)}]")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    mode = 'auto'
+    if '--mode' in args:
+        index = args.index('--mode')
+        mode = args[index + 1]
+        del args[index:index + 2]
+
+    publisher = AssetPublisher(mode)
+    dest_dir = Path(args[0])
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    for name in args[1:]:
+        print(f"{publisher.publish(Path(name), dest_dir / Path(name).name)}: {name}")
+    print(json.dumps(publisher.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Atlas Packer for Desktop Pet Generator
+Packs animation frames from all sprite sheets into a few shared atlas textures
+"""
+
+import json
+import math
+import sys
+from typing import List, Tuple
+
+
+def next_power_of_two(value: int) -> int:
+    """Smallest power of two >= value"""
+    return 1 << max(0, math.ceil(math.log2(max(1, value))))
+
+
+class AtlasPacker:
+    """
+    Shelf bin packer for sprite frames
+
+    Frames are sorted by height and laid out left to right on shelves.
+    Pages are bounded by max_size (a power of two) and their final size
+    is rounded up to a power of two. The players draw frames unscaled
+    with pixelated rendering, so frames touch by default; a `padding`
+    gutter keeps smoothed scaling from bleeding into neighbours.
+    """
+
+    def __init__(self, max_size: int = 2048, padding: int = 0):
+        if max_size != next_power_of_two(max_size):
+            raise ValueError(f"Atlas max size must be a power of two: {max_size}")
+        self.max_size = max_size
+        self.padding = padding
+
+    def pack(self, sizes: List[Tuple[int, int]]) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]]]:
+        """
+        Place rectangles of the given (width, height) sizes
+        Returns (page, x, y) for each input in order, plus each page's size
+        """
+        for width, height in sizes:
+            if width > self.max_size or height > self.max_size:
+                raise ValueError(f"Frame {width}x{height} exceeds atlas max size {self.max_size}")
+
+        order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0], i))
+
+        # Try every power-of-two shelf width that fits the widest frame and
+        # keep the layout with the fewest pages, then the least page area,
+        # then the most square pages
+        widest = max((w for w, _ in sizes), default=1)
+        best = None
+        page_width = next_power_of_two(widest)
+        while page_width <= self.max_size:
+            placements, page_sizes = self._pack_shelves(sizes, order, page_width)
+            score = (len(page_sizes), sum(w * h for w, h in page_sizes),
+                     max(max(w, h) for w, h in page_sizes))
+            if best is None or score < best[0]:
+                best = (score, placements, page_sizes)
+            page_width *= 2
+
+        return best[1], best[2]
+
+    def _pack_shelves(self, sizes: List[Tuple[int, int]], order: List[int],
+                      page_width: int) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]]]:
+        """Shelf-pack in the given order onto pages page_width pixels wide"""
+        pad = self.padding
+        placements = [None] * len(sizes)
+        page_extents = []
+
+        page = 0
+        x = y = shelf_height = used_width = 0
+
+        for index in order:
+            width, height = sizes[index]
+
+            # Start a new shelf when the frame does not fit on this one
+            if x + width > page_width:
+                y += shelf_height
+                x = shelf_height = 0
+
+            # Start a new page when the shelf would leave the page
+            if y + height > self.max_size:
+                page_extents.append((used_width, y))
+                page += 1
+                x = y = shelf_height = used_width = 0
+
+            placements[index] = (page, x, y)
+            x += width + pad
+            shelf_height = max(shelf_height, height + pad)
+            used_width = max(used_width, x - pad)
+
+        page_extents.append((used_width, y + shelf_height - pad))
+
+        page_sizes = [(next_power_of_two(w), next_power_of_two(h)) for w, h in page_extents]
+        return placements, page_sizes
+
+
+def main():
+    """CLI entry point: pack N frames of a given size and print the layout"""
+    if len(sys.argv) < 3:
+        print("Usage: python atlas_packer.py <frame_count> <frame_size> [max_size]")
+        sys.exit(1)
+
+    count, frame_size = int(sys.argv[1]), int(sys.argv[2])
+    max_size = int(sys.argv[3]) if len(sys.argv) > 3 else 2048
+
+    placements, page_sizes = AtlasPacker(max_size=max_size).pack([(frame_size, frame_size)] * count)
+    print(json.dumps({
+        "pages": [list(size) for size in page_sizes],
+        "placements": [list(p) for p in placements]
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
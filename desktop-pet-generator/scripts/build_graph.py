@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Build Graph for Desktop Pet Generator
+Incremental rebuilds of pet outputs, tracked in a manifest inside the output directory
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from lazy_import import lazy_import
+from sprite_cache import SpriteCache
+
+# Only builds that run nodes side by side need it
+concurrent_futures = lazy_import('concurrent.futures')
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 1
+
+# A build step returns the files it wrote and a JSON-serializable result
+# for the steps after it, or None when it produced nothing worth keeping
+# (e.g. packaging failed) so that the next run tries again
+BuildResult = Optional[Tuple[List[Path], Any]]
+
+_say_lock = threading.Lock()
+
+
+def say(line: str):
+    """
+    print() for build steps: the line is written whole, under a lock, so
+    lines of nodes building side by side never run together
+    """
+    with _say_lock:
+        sys.stdout.write(line + '\n')
+
+
+class BuildGraph:
+    """
+    Runs named build steps (nodes) only when they are stale
+
+    Each node records in the manifest a fingerprint of its inputs, the
+    content hash of every file it wrote and its result. A node is stale
+    when it is new, its inputs changed, one of its outputs is missing or
+    was edited, or a dependency's outputs changed. Up-to-date nodes are
+    skipped and hand back their recorded result. A node that rebuilds
+    first removes the files it wrote last time, so nothing left over from
+    an earlier build (e.g. a dropped animation's sheet) gets shipped.
+    With jobs > 1, nodes given to submit() build on worker threads as
+    soon as the nodes they depend on are done.
+    """
+
+    def __init__(self, output_dir: Path, dry_run: bool = False, force: bool = False,
+                 progress: Optional[Callable[[str, str], None]] = None, jobs: int = 1):
+        self.output_dir = Path(output_dir)
+        self.manifest_path = self.output_dir / MANIFEST_NAME
+        self.dry_run = dry_run
+        self.force = force
+        # Called as progress(node, state) with state 'building', 'built',
+        # 'up to date' or 'stale' (dry run)
+        self.progress = progress or (lambda node, state: None)
+        self.nodes = self._load_manifest()
+        self.stale: Dict[str, str] = {}  # node -> why it (would) rebuild
+        self.fresh: List[str] = []
+        self.timings: Dict[str, float] = {}  # node -> seconds spent building it
+        self.jobs = jobs
+        self._lock = threading.RLock()  # guards nodes and the manifest file
+        self._tasks: Dict[str, Future] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('nodes', {})
+
+    def _save_manifest(self):
+        # Written after every node so an interrupted build keeps its progress
+        with self._lock:
+            # Not mkstemp: its files are 0600, this one gets the umask like open()
+            tmp_path = self.manifest_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.unlink(missing_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'nodes': self.nodes}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+
+    def file_digest(self, path) -> str:
+        """Content hash of an input file, e.g. the source image or a template"""
+        return SpriteCache.hash_file(path)
+
+    def _record_outputs(self, paths: Iterable[Path]) -> Dict[str, Dict]:
+        outputs = {}
+        for path in paths:
+            path = Path(path)
+            stat = path.stat()
+            outputs[path.relative_to(self.output_dir).as_posix()] = {
+                'sha256': SpriteCache.hash_file(path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            }
+        return outputs
+
+    def outputs_changed(self, outputs: Dict[str, Dict], refresh: bool = False) -> Optional[str]:
+        """
+        First recorded output that is missing or has different contents
+        With refresh, outputs that were touched but not changed get their
+        new mtime recorded and saved, so the next run skips hashing them.
+        """
+        touched = {}
+        for name, recorded in outputs.items():
+            path = self.output_dir / name
+            try:
+                stat = path.stat()
+            except OSError:
+                return f"{name} missing"
+            # Unchanged size and mtime: trust the recorded hash
+            if stat.st_size == recorded['size'] and stat.st_mtime_ns == recorded['mtime_ns']:
+                continue
+            if stat.st_size != recorded['size'] or SpriteCache.hash_file(path) != recorded['sha256']:
+                return f"{name} modified"
+            touched[name] = stat.st_mtime_ns
+        if refresh and touched:
+            with self._lock:
+                for name, mtime_ns in touched.items():
+                    outputs[name]['mtime_ns'] = mtime_ns
+                self._save_manifest()
+        return None
+
+    def outputs_digest(self, name: str) -> str:
+        """Combined content hash of everything a node wrote"""
+        outputs = self.nodes.get(name, {}).get('outputs', {})
+        return SpriteCache.make_key({path: output['sha256'] for path, output in outputs.items()})
+
+    def run(self, name: str, inputs: Callable[[], Dict], build: Callable[[], BuildResult],
+            deps: Tuple[str, ...] = ()) -> Any:
+        """
+        Build a node if it is stale and return its result
+        inputs is called only once the dependencies are up to date, so it
+        may use their results. In a dry run nothing is built: the reason a
+        stale node would rebuild is recorded and None is returned.
+        """
+        for dep in deps:
+            # A submitted dependency that failed fails this node too
+            task = self._tasks.get(dep)
+            if task is not None:
+                task.result()
+
+        stale_deps = [dep for dep in deps if dep in self.stale]
+        if self.dry_run and stale_deps:
+            return self._mark_stale(name, f"after {', '.join(stale_deps)}")
+
+        fields = {'inputs': inputs(), 'deps': {dep: self.outputs_digest(dep) for dep in deps}}
+        fingerprint = SpriteCache.make_key(fields)
+
+        record = self.nodes.get(name)
+        if self.force:
+            reason = "forced"
+        elif record is None:
+            reason = "new"
+        elif record['fingerprint'] != fingerprint:
+            reason = "inputs changed"
+        else:
+            reason = self.outputs_changed(record['outputs'], refresh=not self.dry_run)
+
+        if reason is None:
+            self.fresh.append(name)
+            say(f"⏭️  {name}: up to date")
+            self.progress(name, 'up to date')
+            return record['result']
+
+        if self.dry_run:
+            return self._mark_stale(name, reason)
+
+        self.stale[name] = reason
+        say(f"🔨 {name}: rebuilding ({reason})")
+        self.progress(name, 'building')
+        if record is not None:
+            for old in record['outputs']:
+                try:
+                    (self.output_dir / old).unlink()
+                except OSError:
+                    pass
+            with self._lock:
+                self.nodes.pop(name)
+                self._save_manifest()
+
+        start = time.perf_counter()
+        built = build()
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        self.progress(name, 'built')
+        if built is None:
+            return None
+
+        paths, result = built
+        outputs = self._record_outputs(paths)
+        with self._lock:
+            self.nodes[name] = {'fingerprint': fingerprint, 'outputs': outputs, 'result': result}
+            self._save_manifest()
+        return result
+
+    def submit(self, name: str, inputs: Callable[[], Dict], build: Callable[[], BuildResult],
+               deps: Tuple[str, ...] = ()) -> Future:
+        """
+        Like run(), on a worker thread; returns a future of the node's result
+        The node waits there for the submitted nodes it depends on, so
+        independent nodes build side by side. Workers run in the caller's
+        context (e.g. where its output goes). With jobs=1 the node is built
+        right away and errors are raised here.
+        """
+        if self.jobs <= 1:
+            task = concurrent_futures.Future()
+            task.set_result(self.run(name, inputs, build, deps))
+        else:
+            if self._pool is None:
+                self._pool = concurrent_futures.ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='build')
+            task = self._pool.submit(contextvars.copy_context().run, self.run, name, inputs, build, deps)
+        self._tasks[name] = task
+        return task
+
+    def wait(self):
+        """
+        Wait for all submitted nodes and raise the first failure, if any
+        If interrupted, nodes that have not started yet are cancelled.
+        """
+        try:
+            for task in list(self._tasks.values()):
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _mark_stale(self, name: str, reason: str) -> None:
+        self.stale[name] = reason
+        say(f"🔁 {name}: would rebuild ({reason})")
+        self.progress(name, 'stale')
+        return None
+
+    def artifacts(self) -> List[Path]:
+        """Files written by the nodes run in this build, whether rebuilt or up to date"""
+        return [self.output_dir / path for name in list(self.stale) + self.fresh
+                for path in self.nodes.get(name, {}).get('outputs', {})]
+
+    def summary(self) -> str:
+        """One-line account of what was (or would be) rebuilt"""
+        verb = "would rebuild" if self.dry_run else "rebuilt"
+        return f"🧱 Build: {len(self.stale)} {verb}, {len(self.fresh)} up to date"
+
+
+def main():
+    """CLI entry point: show which recorded outputs of a pet are still intact"""
+    if len(sys.argv) < 2:
+        print("Usage: python build_graph.py <output_dir>")
+        sys.exit(1)
+
+    graph = BuildGraph(Path(sys.argv[1]), dry_run=True)
+    print(json.dumps({
+        name: {
+            "outputs": len(record['outputs']),
+            "changed": graph.outputs_changed(record['outputs'])
+        }
+        for name, record in graph.nodes.items()
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
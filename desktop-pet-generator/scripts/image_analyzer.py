@@ -4,46 +4,64 @@ Image Analyzer for Desktop Pet Generator
 Extracts features, colors, and metadata from uploaded images
 """
 
+from __future__ import annotations
+
 import sys
 import json
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+from lazy_import import lazy_import
+
+# Imported when the first image is analyzed, not for the usage message
 try:
-    from PIL import Image
-    import numpy as np
+    Image = lazy_import('PIL.Image')
+    np = lazy_import('numpy')
 except ImportError:
     print("Missing dependencies. Install with: pip install Pillow numpy", file=sys.stderr)
     sys.exit(1)
 
+from image_loader import DEFAULT_MAX_PIXELS, ImageTooLargeError, load_image
+
+# Analysis runs on a copy decoded to fit this box; dimensions still come
+# from the original file
+ANALYSIS_SIZE = (1024, 1024)
+
 
 class ImageAnalyzer:
     """Analyzes images for desktop pet generation"""
 
-    def __init__(self, image_path: str):
+    def __init__(self, image_path: str, max_pixels: Optional[int] = DEFAULT_MAX_PIXELS):
         self.image_path = Path(image_path)
         self.image = None
+        self.source_size = None
+        self.format = None
+        self.max_pixels = max_pixels
         self.load_image()
 
     def load_image(self):
-        """Load and validate image file"""
+        """Load and validate image file, decoded at analysis size"""
         if not self.image_path.exists():
             raise FileNotFoundError(f"Image not found: {self.image_path}")
 
         try:
-            self.image = Image.open(self.image_path)
-            # Convert to RGBA if not already
-            if self.image.mode != 'RGBA':
-                self.image = self.image.convert('RGBA')
+            loaded = load_image(self.image_path, ANALYSIS_SIZE, max_pixels=self.max_pixels)
+        except ImageTooLargeError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to load image: {e}")
 
+        self.image = loaded.image
+        self.source_size = loaded.source_size
+        self.format = loaded.format
+
     def get_dimensions(self) -> Dict[str, int]:
         """Get image dimensions"""
+        width, height = self.source_size
         return {
-            "width": self.image.width,
-            "height": self.image.height,
-            "aspect_ratio": round(self.image.width / self.image.height, 2)
+            "width": width,
+            "height": height,
+            "aspect_ratio": round(width / height, 2)
         }
 
     def has_transparency(self) -> bool:
@@ -212,7 +230,7 @@ class ImageAnalyzer:
             "file": {
                 "path": str(self.image_path),
                 "name": self.image_path.name,
-                "format": self.image.format,
+                "format": self.format,
                 "size_kb": round(self.image_path.stat().st_size / 1024, 2)
             },
             "dimensions": self.get_dimensions(),
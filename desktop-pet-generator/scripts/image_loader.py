@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Image Loader for Desktop Pet Generator
+Decodes uploads close to the size they are needed at, with a pixel cap against decompression bombs
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from lazy_import import lazy_import
+
+Image = lazy_import('PIL.Image')
+
+# Largest accepted upload (width * height); phone cameras go up to ~50 MP
+DEFAULT_MAX_PIXELS = 100_000_000
+
+# Decoding and reducing stop at this multiple of the final size before the
+# LANCZOS pass, as in Image.thumbnail
+REDUCING_GAP = 2.0
+
+# Modes resized with the requested filter; others (palette, bilevel, ...)
+# are converted to RGBA first
+_RESAMPLE_MODES = ('L', 'LA', 'RGB', 'RGBA')
+
+# Image.MAX_IMAGE_PIXELS is process-wide; opens that lift it take turns
+_open_lock = threading.Lock()
+
+
+class ImageTooLargeError(ValueError):
+    """The image has more pixels than the configured cap"""
+
+
+@dataclass
+class LoadedImage:
+    """A decoded RGBA image plus facts about the file it came from"""
+    image: Image.Image
+    source_size: Tuple[int, int]  # full-resolution (width, height) from the file header
+    format: Optional[str]
+
+
+def thumbnail_size(source_size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Size Image.thumbnail would shrink source_size to, rounded the same way"""
+    width, height = source_size
+    x, y = box
+    if x >= width and y >= height:
+        return width, height
+
+    def round_aspect(number, key):
+        return max(min(math.floor(number), math.ceil(number), key=key), 1)
+
+    aspect = width / height
+    if x / y >= aspect:
+        return round_aspect(y * aspect, key=lambda n: abs(aspect - n / y)), y
+    return x, round_aspect(x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n))
+
+
+def load_image(path, fit: Optional[Tuple[int, int]] = None, scale: int = 1,
+               max_pixels: Optional[int] = DEFAULT_MAX_PIXELS) -> LoadedImage:
+    """
+    Open an image as RGBA, decoding no more than the output needs
+    With a fit box the result is the Image.thumbnail size for that box
+    times scale. JPEGs decode at a reduced DCT scale and the rest is
+    reduced and LANCZOS-resampled in one resize. The pixel cap is checked
+    on the header, before any pixel data is decoded, and replaces Pillow's
+    own bomb check, so it may be set above or below Pillow's limit.
+    """
+    with _open_lock:
+        pillow_limit = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            image = Image.open(path)
+        finally:
+            Image.MAX_IMAGE_PIXELS = pillow_limit
+
+    with image:
+        source_size = image.size
+        image_format = image.format
+        pixels = source_size[0] * source_size[1]
+        if max_pixels is not None and pixels > max_pixels:
+            raise ImageTooLargeError(f"{path}: {source_size[0]}x{source_size[1]} is {pixels / 1e6:.1f} MP, "
+                                     f"over the {max_pixels / 1e6:.1f} MP limit")
+
+        if fit is None:
+            return LoadedImage(image.convert('RGBA'), source_size, image_format)
+
+        width, height = thumbnail_size(source_size, fit)
+        size = (width * scale, height * scale)
+        # A reduced JPEG decode may cover slightly more than the original
+        # area; draft reports the box to resample from
+        box = None
+        if image_format == 'JPEG':
+            drafted = image.draft(None, (int(size[0] * REDUCING_GAP), int(size[1] * REDUCING_GAP)))
+            if drafted is not None:
+                box = drafted[1]
+
+        if image.mode not in _RESAMPLE_MODES:
+            image = image.convert('RGBA')
+        if image.size != size or box is not None:
+            image = image.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=REDUCING_GAP)
+
+        return LoadedImage(image.convert('RGBA'), source_size, image_format)
+
+
+def main():
+    """CLI entry point: load an image at a target size and print what was decoded"""
+    if len(sys.argv) < 2:
+        print("Usage: python image_loader.py <image> [target_size] [max_megapixels]")
+        sys.exit(1)
+
+    target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    max_pixels = int(float(sys.argv[3]) * 1_000_000) if len(sys.argv) > 3 else DEFAULT_MAX_PIXELS
+
+    loaded = load_image(Path(sys.argv[1]), (target, target) if target else None, max_pixels=max_pixels)
+    print(json.dumps({
+        "format": loaded.format,
+        "source_size": list(loaded.source_size),
+        "decoded_size": list(loaded.image.size)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
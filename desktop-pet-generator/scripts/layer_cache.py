@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Layer Cache for Desktop Pet Generator
+In-memory LRU memo of resampled source layers shared by all animations of a build
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Rotations closer than this are the same resampling; it only absorbs
+# float noise from keyframe interpolation, e.g. -4.999999999 vs -5
+ROTATION_QUANTUM = 1e-9  # degrees
+
+
+def quantize_rotation(rotation: float, step: float = ROTATION_QUANTUM) -> float:
+    """Rotation snapped to a multiple of step, as used both in keys and for rendering"""
+    return round(round(rotation / step) * step, 9)
+
+
+class LayerCache:
+    """
+    Size-bounded LRU memo of resampled layers of one source image
+
+    A layer is the source resampled into a whole frame box, keyed by
+    what the resampling depends on: (frame_w, frame_h, rotation) with the
+    rotation quantized. Frames of any animation that scale and rotate the
+    same way reuse it and only place it differently. Layers are read-only
+    and safe to share between render threads.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._layers: 'OrderedDict[Hashable, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Cached layer for key, computing and storing it on a miss
+        Layers larger than the whole cap are returned without being kept.
+        """
+        with self._lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                self.hits += 1
+                return layer
+            self.misses += 1
+
+        # Resample outside the lock; racing threads may both compute a
+        # layer, the second store is then a no-op
+        layer = np.asarray(compute())
+        layer.flags.writeable = False
+        if layer.nbytes > self.max_bytes:
+            return layer
+
+        with self._lock:
+            if key not in self._layers:
+                self._layers[key] = layer
+                self.bytes += layer.nbytes
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._layers.popitem(last=False)
+                    self.bytes -= evicted.nbytes
+                    self.evictions += 1
+        return layer
+
+    def clear(self):
+        """Drop all layers; counters are kept"""
+        with self._lock:
+            self._layers.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for this cache's lifetime"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "layers": len(self._layers),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+def main():
+    """CLI entry point: render every animation of an image through one cache and print its stats"""
+    if len(sys.argv) < 2:
+        print("Usage: python layer_cache.py <image> [size] [max_mb]")
+        sys.exit(1)
+
+    from image_loader import load_image
+    from pet_generator import ANIMATION_CONFIGS, render_animations
+
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    max_bytes = int(float(sys.argv[3]) * 1024 * 1024) if len(sys.argv) > 3 else DEFAULT_MAX_BYTES
+
+    img = load_image(sys.argv[1], (size, size)).image.convert('RGBa')
+    layers = LayerCache(max_bytes)
+    render_animations(img, list(ANIMATION_CONFIGS), (size, size), layers=layers)
+    print(json.dumps(layers.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
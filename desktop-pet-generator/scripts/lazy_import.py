@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Lazy Imports for Desktop Pet Generator
+Module stand-ins that import numpy, Pillow and friends only when first used,
+so --help and config-only runs start without them
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+# Modules that dominate startup time; main() reports which of them a
+# script still imports eagerly
+HEAVY_MODULES = ('numpy', 'PIL.Image', 'zipfile', 'subprocess', 'concurrent.futures.process')
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access
+    Once loaded, the module's namespace is copied in so later lookups are
+    plain attribute hits. The stand-in never enters sys.modules; pickling
+    and `import x` elsewhere see the real module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                module = importlib.import_module(self.__name__)
+                self.__dict__.update(module.__dict__)
+                self.__dict__['_lazy_module'] = module
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        # Only called for names not copied in yet, e.g. before the first
+        # load or for submodules the real module imports on demand
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Module `name`, imported on first use
+    Already imported modules are returned as they are. A module that is not
+    installed raises ImportError here, as a plain import would.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return LazyModule(name)
+
+
+def main():
+    """CLI entry point: import script modules and list the heavy modules they load eagerly"""
+    if len(sys.argv) < 2:
+        print("Usage: python lazy_import.py <module> [module ...]")
+        sys.exit(1)
+
+    status = 0
+    for name in sys.argv[1:]:
+        importlib.import_module(name)
+        eager = [heavy for heavy in HEAVY_MODULES if heavy in sys.modules]
+        print(f"{'⚠️ ' if eager else '✅'} {name}: {', '.join(eager) if eager else 'no heavy imports'}")
+        status = status or bool(eager)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Pet Daemon for Desktop Pet Generator
+Long-running generator with a local HTTP JSON job API over TCP or a Unix socket
+
+Endpoints:
+  GET  /health                          queue and worker state
+  POST /jobs                            submit a pet (JSON options, see below)
+  GET  /jobs                            all jobs
+  GET  /jobs/<id>                       status and progress of one job
+  GET  /jobs/<id>/artifacts             files the job produced
+  GET  /jobs/<id>/artifacts/<path>      download one file
+
+A job body takes the same fields as a --batch manifest line, with the
+image given either as a local path ("image") or inline ("image_base64").
+Outputs go to the daemon's work directory; output, cache, packaging
+(no_package), parallelism (jobs, executor) and memory (max_megapixels,
+layer_cache_mb) options are the daemon's and refused with 400, as are
+frame sizes, frame counts and tween factors above its limits. Jobs with the same image bytes and options share
+one job id, so identical concurrent submissions are built once.
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import queue
+import shutil
+import signal
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from build_graph import MANIFEST_NAME
+from pet_generator import GENERATOR_VERSION, _batch_pet_args, _build_parser, build_pet, capture_output
+from sprite_cache import SpriteCache
+
+# Options a job may not set: where outputs go and how much of the machine
+# a build may use (npm, worker processes, memory, image size) are up to
+# the daemon
+_DAEMON_FIELDS = ('output', 'cache_dir', 'cache_max_mb', 'no_package', 'executor', 'jobs',
+                  'max_megapixels', 'layer_cache_mb')
+
+# Largest frame count and tween factor a job may ask for; the frame edge
+# is limited by the daemon's max_size
+_JOB_LIMITS = {'frames': 64, 'tween': 8}
+
+
+class QueueFullError(Exception):
+    """The job queue is at capacity; the client should retry later"""
+
+
+@dataclass
+class Job:
+    """One pet generation request and its progress"""
+    id: str
+    options: argparse.Namespace
+    status: str = 'queued'  # queued, running, succeeded or failed
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    steps: Dict[str, str] = field(default_factory=dict)  # build step -> last state
+    submissions: int = 1  # identical submissions answered by this job
+    error: Optional[str] = None
+    summary: Optional[Dict] = None
+    log: io.StringIO = field(default_factory=io.StringIO)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'name': self.options.name,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'seconds': round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            'steps': self.steps,
+            'submissions': self.submissions,
+            'error': self.error,
+            'summary': self.summary
+        }
+
+
+class PetDaemon:
+    """
+    Bounded job queue served by a pool of worker threads
+
+    Workers share this process's imports, template cache and, with a
+    cache directory, the sprite cache. A job's id is derived from the
+    image bytes and options; submitting a job whose id is queued, running
+    or has succeeded returns that job instead of queuing another. Only the
+    keep_jobs most recently finished jobs are kept; older ones are
+    forgotten and their outputs and uploads deleted.
+    """
+
+    def __init__(self, work_dir: Path, workers: int = 2, max_queue: int = 16,
+                 cache_dir: Optional[str] = None, cache_max_mb: float = 512, keep_jobs: int = 100,
+                 max_size: int = 512):
+        self.work_dir = Path(work_dir)
+        self.uploads_dir = self.work_dir / "uploads"
+        self.jobs_dir = self.work_dir / "jobs"
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self.defaults = _build_parser().parse_args([])
+        self.defaults.no_package = True  # npm packaging is a separate, slow step
+        self.defaults.cache_dir = cache_dir
+        self.defaults.cache_max_mb = cache_max_mb
+
+        self.keep_jobs = keep_jobs
+        self.max_size = max_size
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self.queue: 'queue.Queue[Optional[Job]]' = queue.Queue(maxsize=max_queue)
+        self.workers = [threading.Thread(target=self._work, name=f"pet-worker-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        self.prune()
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """Let workers finish their current job, then end them"""
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def _store_upload(self, data: bytes, path: Path):
+        # Called under self.lock, so pruning never sees an upload that is
+        # stored but not yet referenced by a job
+        if not path.exists():
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+    def submit(self, body: Dict) -> Tuple[Job, bool]:
+        """
+        Validate a job request and queue it, or return the identical job
+        already known; the flag tells which. Raises ValueError for a bad
+        request and QueueFullError when the queue is at capacity.
+        """
+        if not isinstance(body, dict):
+            raise ValueError("job must be a JSON object")
+        entry = dict(body)
+        blocked = sorted(key for key in entry if key.replace('-', '_') in _DAEMON_FIELDS)
+        if blocked:
+            raise ValueError(f"fields set by the daemon: {', '.join(blocked)}")
+
+        upload = None
+        if 'image_base64' in entry:
+            try:
+                upload = base64.b64decode(entry.pop('image_base64'), validate=True)
+            except (binascii.Error, TypeError) as e:
+                raise ValueError(f"image_base64 is not valid base64: {e}") from e
+            entry['image'] = str(self.uploads_dir / hashlib.sha256(upload).hexdigest())
+        elif not Path(str(entry.get('image', ''))).is_file():
+            raise ValueError(f"image not found: {entry.get('image')}")
+
+        options = _batch_pet_args(self.defaults, entry, Path.cwd())
+        self._check_limits(options)
+        fields = vars(options).copy()
+        # Uploads are named by the same hash hash_file gives
+        fields['image'] = Path(options.image).name if upload is not None else SpriteCache.hash_file(options.image)
+        del fields['output']
+        job_id = SpriteCache.make_key(fields)[:16]
+        options.output = str(self.jobs_dir / job_id)
+
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status != 'failed':
+                job.submissions += 1
+                return job, True
+            job = Job(job_id, options)
+            if upload is not None:
+                self._store_upload(upload, Path(options.image))
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"job queue is full ({self.queue.maxsize} jobs)") from None
+            self.jobs[job_id] = job
+        return job, False
+
+    def _check_limits(self, options: argparse.Namespace):
+        # Job fields arrive as JSON values, not through argparse
+        limits = {**_JOB_LIMITS, 'size': self.max_size}
+        for key, limit in limits.items():
+            value = getattr(options, key)
+            if type(value) is not int or not 1 <= value <= limit:
+                raise ValueError(f"{key} must be a whole number from 1 to {limit}")
+        try:
+            densities = [int(d) for d in str(options.densities).split(',')]
+        except ValueError:
+            raise ValueError(f"densities must be whole numbers: {options.densities}") from None
+        if min(densities) < 1 or options.size * max(densities) > self.max_size:
+            raise ValueError(f"size times the highest density must be at most {self.max_size}")
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job):
+        job.status, job.started = 'running', time.time()
+
+        def progress(step, state):
+            job.steps[step] = state
+
+        try:
+            with capture_output(job.log):
+                job.summary = build_pet(job.options, progress=progress)
+            job.status = 'succeeded'
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+        print(f"{'✅' if job.status == 'succeeded' else '❌'} job {job.id} "
+              f"({job.options.name}): {job.status} in {job.finished - job.started:.2f}s")
+        self.prune()
+
+    def prune(self) -> List[str]:
+        """
+        Forget finished jobs beyond the keep_jobs most recent, delete the
+        output directories and uploads no remaining job uses (including
+        those left by an earlier run of the daemon), and return the ids
+        forgotten
+        Deletion happens under the lock: a forgotten job submitted again
+        must not start writing into a directory still being removed.
+        """
+        with self.lock:
+            finished = sorted((job for job in self.jobs.values() if job.finished is not None),
+                              key=lambda job: job.finished)
+            expired = finished[:max(0, len(finished) - self.keep_jobs)]
+            for job in expired:
+                del self.jobs[job.id]
+            images = {Path(job.options.image).name for job in self.jobs.values()}
+            for path in self.jobs_dir.iterdir():
+                if path.name not in self.jobs:
+                    shutil.rmtree(path, ignore_errors=True)
+            for path in self.uploads_dir.iterdir():
+                if path.name not in images:
+                    path.unlink(missing_ok=True)
+        return [job.id for job in expired]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """Jobs queued ahead of this one plus one, or None once it has started"""
+        if job.status != 'queued':
+            return None
+        with self.lock:
+            return 1 + sum(1 for other in self.jobs.values()
+                           if other.status == 'queued' and other.submitted < job.submitted)
+
+    def artifacts(self, job: Job) -> List[str]:
+        """Files in a finished job's output directory, relative to it"""
+        out_dir = Path(job.options.output)
+        if job.status != 'succeeded' or not out_dir.is_dir():
+            return []
+        return sorted(path.relative_to(out_dir).as_posix() for path in out_dir.rglob('*')
+                      if path.is_file() and path.name != MANIFEST_NAME)
+
+    def health(self) -> Dict:
+        with self.lock:
+            states = [job.status for job in self.jobs.values()]
+        return {
+            'status': 'ok',
+            'version': GENERATOR_VERSION,
+            'workers': len(self.workers),
+            'queued': states.count('queued'),
+            'running': states.count('running'),
+            'succeeded': states.count('succeeded'),
+            'failed': states.count('failed'),
+            'max_queue': self.queue.maxsize
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API over the PetDaemon attached to the server"""
+
+    server_version = f"PetDaemon/{GENERATOR_VERSION}"
+    max_body = 64 * 1024 * 1024
+
+    @property
+    def daemon(self) -> PetDaemon:
+        return self.server.pet_daemon
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, headers: Optional[Dict] = None):
+        self._send_json(status, {'error': message}, headers)
+
+    def _job_payload(self, job: Job) -> Dict:
+        payload = job.to_dict()
+        payload['queue_position'] = self.daemon.queue_position(job)
+        if job.status == 'failed':
+            payload['log'] = job.log.getvalue()
+        return payload
+
+    def do_GET(self):
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip('/').split('/') if part]
+        if parts == ['health']:
+            return self._send_json(HTTPStatus.OK, self.daemon.health())
+        if parts == ['jobs']:
+            with self.daemon.lock:
+                jobs = list(self.daemon.jobs.values())
+            return self._send_json(HTTPStatus.OK, [job.to_dict() for job in jobs])
+        if len(parts) < 2 or parts[0] != 'jobs':
+            return self._error(HTTPStatus.NOT_FOUND, f"no such endpoint: {self.path}")
+
+        job = self.daemon.get(parts[1])
+        if job is None:
+            return self._error(HTTPStatus.NOT_FOUND, f"no such job: {parts[1]}")
+        if len(parts) == 2:
+            return self._send_json(HTTPStatus.OK, self._job_payload(job))
+        if parts[2] != 'artifacts':
+            return self._error(HTTPStatus.NOT_FOUND, f"no such endpoint: {self.path}")
+        if job.status != 'succeeded':
+            return self._error(HTTPStatus.CONFLICT, f"job {job.id} is {job.status}")
+        if len(parts) == 3:
+            return self._send_json(HTTPStatus.OK, self.daemon.artifacts(job))
+
+        # Only files the job listed can be fetched, nothing outside its directory
+        name = '/'.join(parts[3:])
+        if name not in self.daemon.artifacts(job):
+            return self._error(HTTPStatus.NOT_FOUND, f"no such artifact: {name}")
+        path = Path(job.options.output) / name
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(path.stat().st_size))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/jobs':
+            return self._error(HTTPStatus.NOT_FOUND, f"no such endpoint: {self.path}")
+        length = self.headers.get('Content-Length') or '0'
+        if not length.isdecimal():
+            return self._error(HTTPStatus.BAD_REQUEST, f"bad Content-Length: {length}")
+        length = int(length)
+        if length > self.max_body:
+            return self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request body over {self.max_body} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b'null')
+            job, coalesced = self.daemon.submit(body)
+        except QueueFullError as e:
+            return self._error(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {'Retry-After': '1'})
+        except ValueError as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+
+        payload = self._job_payload(job)
+        payload['coalesced'] = coalesced
+        status = HTTPStatus.OK if job.status == 'succeeded' else HTTPStatus.ACCEPTED
+        self._send_json(status, payload, {'Location': f"/jobs/{job.id}"})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix domain socket, one thread per connection"""
+    daemon_threads = True
+
+
+def make_server(daemon: PetDaemon, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None):
+    """HTTP server for a daemon, on a Unix socket if socket_path is given"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.pet_daemon = daemon
+    return server
+
+
+def main():
+    """CLI entry point: serve the job API until interrupted"""
+    parser = argparse.ArgumentParser(description='Desktop Pet Generator daemon with a local JSON job API')
+    parser.add_argument('--work-dir', default='./pet-daemon', help='Uploads and job outputs (default: ./pet-daemon)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port, 0 for any free port (default: 8765)')
+    parser.add_argument('--socket', default=None, help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=2, help='Jobs generated at the same time (default: 2)')
+    parser.add_argument('--max-queue', type=int, default=16,
+                        help='Jobs waiting beyond this are refused with 503 (default: 16)')
+    parser.add_argument('--cache-dir', default=None, help='Sprite cache shared by all jobs')
+    parser.add_argument('--cache-max-mb', type=float, default=512,
+                        help='Size limit for --cache-dir before LRU eviction (default: 512)')
+    parser.add_argument('--max-size', type=int, default=512,
+                        help='Largest frame size (times density) a job may ask for (default: 512)')
+    parser.add_argument('--keep-jobs', type=int, default=100,
+                        help='Finished jobs kept with their outputs; older ones are deleted (default: 100)')
+    args = parser.parse_args()
+    if args.workers < 1 or args.max_queue < 1 or args.max_size < 1:
+        parser.error("--workers, --max-queue and --max-size must be positive")
+    if args.keep_jobs < 0:
+        parser.error("--keep-jobs must not be negative")
+
+    daemon = PetDaemon(Path(args.work_dir), workers=args.workers, max_queue=args.max_queue,
+                       cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb, keep_jobs=args.keep_jobs,
+                       max_size=args.max_size)
+    server = make_server(daemon, args.host, args.port, args.socket)
+    daemon.start()
+    # Service managers stop with SIGTERM; shut down as cleanly as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    where = args.socket or f"http://{server.server_address[0]}:{server.server_address[1]}"
+    print(f"🐾 Pet daemon v{GENERATOR_VERSION} listening on {where} "
+          f"({args.workers} workers, queue of {args.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n👋 Shutting down...")
+        server.server_close()
+        daemon.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
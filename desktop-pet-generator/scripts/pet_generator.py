@@ -3,16 +3,64 @@
 Desktop Pet Generator - Main Orchestration Script
 Converts a single user image into an animated desktop pet with multi-animation support
 """
+from __future__ import annotations
+
+import hashlib
 import json
+import math
 import os
 import shutil
 import sys
 import argparse
-import zipfile
-import subprocess
+import contextlib
+import contextvars
+import io
+import threading
+import time
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFilter, ImageChops
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, asdict, replace
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from asset_publisher import LINK_MODES, AssetPublisher
+from atlas_packer import AtlasPacker, next_power_of_two
+from build_graph import BuildGraph, say
+from image_loader import DEFAULT_MAX_PIXELS, ImageTooLargeError, load_image
+from layer_cache import (DEFAULT_MAX_BYTES as DEFAULT_LAYER_CACHE_BYTES, ROTATION_QUANTUM, LayerCache,
+                         quantize_rotation)
+from sprite_cache import SpriteCache
+from sprite_encoder import (ANIMATED_FORMATS, ENCODINGS, PNGStreamWriter, animated_extension, encode_animation,
+                            encode_sheets, file_extension, resolve_animated_formats, resolve_encoding)
+from template_engine import load_template, template_bytes
+from transforms import describe_transform, evaluate_transform
+from lazy_import import lazy_import
+
+# Imported on first use so --help, --dry-run and other runs that render
+# nothing start without them
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+concurrent_futures = lazy_import('concurrent.futures')
+subprocess = lazy_import('subprocess')
+zipfile = lazy_import('zipfile')
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+GENERATOR_VERSION = '2.0'
+
+# Bump whenever rendered sprite pixels change so cached sheets are not reused
+RENDER_REVISION = 3
+
+# Threads for the web, extension, desktop, package and README steps, which
+# run side by side once the sprites are written
+MODE_WORKERS = 4
+
+# With --tween, in-between frames with the same frame box size and a
+# rotation that rounds to the same step share one resampled layer.
+# Without it layers are only shared between exactly matching frames.
+TWEEN_ROTATION_STEP = 0.5  # degrees
 
 # Animation presets and metadata
 ANIMATION_PRESETS = {
@@ -94,144 +142,234 @@ ANIMATION_CONFIGS = {
     }
 }
 
-def create_sprite_sheet_for_animation(img: Image.Image, animation_type: str, size: Tuple[int, int]) -> Image.Image:
+def _frame_placement(img: Image.Image, params: Tuple[float, float, float, int, int, float],
+                     size: Tuple[int, int], rows: Optional[Tuple[int, int]] = None) -> Optional[Tuple]:
     """
-    Generate a sprite sheet for a specific animation type
-    Uses different transformations based on animation type
+    Where a transformed source lands in a frame cell
+    Returns (frame_w, frame_h, region) where region is the visible part of
+    the frame box as (x0, y0, x1, y1) in cell pixels, or None if nothing shows
     """
-    config = ANIMATION_CONFIGS.get(animation_type, ANIMATION_CONFIGS['idle'])
-    frames = config['frames']
-    transform = config['transform']
+    scale_x, scale_y, rotation, offset_x, offset_y, _ = params
+
+    # Box the scaled frame would occupy, placed and clamped like a paste
+    frame_w = max(1, int(img.width * scale_x))
+    frame_h = max(1, int(img.height * scale_y))
+    x_offset = (size[0] - frame_w) // 2 + offset_x
+    y_offset = (size[1] - frame_h) // 2 + offset_y
+    x_offset = max(0, min(x_offset, size[0] - frame_w))
+    y_offset = max(0, min(y_offset, size[1] - frame_h))
+
+    # Rotation keeps the frame box (expand=False), so only the part of the
+    # box that lies inside the cell needs rendering
+    x0, y0 = max(0, x_offset), max(0, y_offset)
+    x1, y1 = min(size[0], x_offset + frame_w), min(size[1], y_offset + frame_h)
+    if rows is not None:
+        y0, y1 = max(y0, rows[0]), min(y1, rows[1])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return frame_w, frame_h, (x_offset, y_offset), (x0, y0, x1, y1)
+
+def _resample(img: Image.Image, frame_w: int, frame_h: int, rotation: float,
+              box: Tuple[int, int, int, int]) -> Image.Image:
+    """
+    Resample box = (x0, y0, x1, y1) of the source scaled to frame_w x frame_h
+    and rotated about its centre, with box in frame box pixels
+    """
+    x0, y0, x1, y1 = box
+
+    # Inverse mapping: patch pixel -> frame box -> unrotated box -> source
+    angle = -math.radians(rotation)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    cx, cy = frame_w / 2, frame_h / 2
+    bx, by = x0 - cx, y0 - cy
+    sx, sy = img.width / frame_w, img.height / frame_h
+    coefficients = (
+        cos_a * sx, sin_a * sx, (cos_a * bx + sin_a * by + cx) * sx,
+        -sin_a * sy, cos_a * sy, (-sin_a * bx + cos_a * by + cy) * sy,
+    )
 
-    # Create sprite sheet
-    sprite_width = size[0] * frames
-    sprite_height = size[1]
-    sprite_sheet = Image.new('RGBA', (sprite_width, sprite_height), (0, 0, 0, 0))
+    # Pure rotations keep nearest-neighbour sampling like Image.rotate did;
+    # anything that rescales gets bilinear filtering
+    if frame_w == img.width and frame_h == img.height:
+        resample = Image.Resampling.NEAREST
+    else:
+        resample = Image.Resampling.BILINEAR
 
-    for i in range(frames):
-        frame = img.copy()
-
-        # Apply animation-specific transformations
-        if transform == 'breathe':
-            # Idle breathing: gentle scale pulsing
-            progress = i / frames
-            scale_factor = 1.0 + 0.1 * abs((progress - 0.5) * 2)
-            new_size = (int(frame.width * scale_factor), int(frame.height * scale_factor))
-            frame = frame.resize(new_size, Image.Resampling.LANCZOS)
-
-        elif transform == 'walk_cycle':
-            # Walking: alternating leg movement simulation
-            progress = i / frames
-            offset_y = int(5 * abs((progress - 0.5) * 2))
-            rotation = -3 + (progress * 6)  # -3 to +3 degrees
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-
-        elif transform == 'jump_arc':
-            # Jumping: parabolic arc
-            progress = i / frames
-            height = -50 * (4 * progress * (1 - progress))  # Parabola
-            offset_y = int(height)
-            squash = 1.0 - 0.2 * abs(progress - 0.5)
-            new_w = int(frame.width * squash)
-            new_h = int(frame.height * (1.0 / squash))
-            frame = frame.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-        elif transform == 'bounce_rotate':
-            # Happy bouncing with rotation
-            progress = i / frames
-            offset_y = -int(15 * abs((progress - 0.5) * 2))
-            rotation = -10 + (progress * 20)  # -10 to +10 degrees
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-
-        elif transform == 'gentle_sway':
-            # Being petted: gentle side sway
-            progress = i / frames
-            rotation = 5 * ((progress - 0.5) * 2)  # -5 to +5 degrees
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-
-        elif transform == 'sleep_fade':
-            # Sleeping: rotate and fade
-            progress = i / frames
-            rotation = -30 * progress
-            alpha = int(255 * (1.0 - 0.5 * progress))
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-            # Apply alpha
-            alpha_layer = Image.new('RGBA', frame.size, (255, 255, 255, alpha))
-            frame = Image.composite(frame, Image.new('RGBA', frame.size, (0, 0, 0, 0)), alpha_layer)
-
-        elif transform == 'chew':
-            # Eating: up-down chewing motion
-            progress = i / frames
-            offset_y = int(8 * abs((progress - 0.5) * 2))
-            scale = 1.0 + 0.15 * abs((progress - 0.5) * 2)
-            new_w = int(frame.width * scale)
-            new_h = int(frame.height / scale)
-            frame = frame.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-        elif transform == 'pounce':
-            # Attack: fast forward motion with stretch
-            progress = i / frames
-            if progress < 0.3:
-                # Wind up
-                offset_x = -int(10 * progress / 0.3)
-                rotation = -15 * progress / 0.3
-            elif progress < 0.7:
-                # Strike
-                offset_x = int(30 * (progress - 0.3) / 0.4)
-                rotation = 15 * (progress - 0.3) / 0.4
-                scale_x = 1.3
-                new_w = int(frame.width * scale_x)
-                frame = frame.resize((new_w, frame.height), Image.Resampling.LANCZOS)
-            else:
-                # Recovery
-                offset_x = 30 - int(30 * (progress - 0.7) / 0.3)
-                rotation = 15 - 15 * (progress - 0.7) / 0.3
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-
-        elif transform == 'shake':
-            # Hurt: rapid shake
-            progress = i / frames
-            offset_x = int(10 * ((-1) ** i))
-            rotation = 5 * ((-1) ** i)
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-
-        elif transform == 'collapse':
-            # Death: fall and fade
-            progress = i / frames
-            rotation = -90 * progress
-            offset_y = int(30 * progress)
-            alpha = int(255 * (1.0 - progress))
-            frame = frame.rotate(rotation, expand=False, fillcolor=(0, 0, 0, 0))
-            alpha_layer = Image.new('RGBA', frame.size, (255, 255, 255, alpha))
-            frame = Image.composite(frame, Image.new('RGBA', frame.size, (0, 0, 0, 0)), alpha_layer)
+    return img.transform((x1 - x0, y1 - y0), Image.Transform.AFFINE, coefficients,
+                         resample=resample, fillcolor=(0, 0, 0, 0))
 
-        else:
-            # Default: simple bounce
-            progress = i / frames
-            offset_y = -int(10 * abs((progress - 0.5) * 2))
+def _composite_frame(img: Image.Image, params: Tuple[float, float, float, int, int, float],
+                     size: Tuple[int, int],
+                     rows: Optional[Tuple[int, int]] = None) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """
+    Render one frame with a single resampling of the source
+    Folds scale, rotation and placement into one affine matrix and returns
+    the rendered patch plus its (x, y) position inside the frame cell.
+    Opacity is left to the caller, which fades all frames in one batch.
+    rows=(top, bottom) renders only that band of the cell.
+    """
+    placement = _frame_placement(img, params, size, rows)
+    if placement is None:
+        return None
+
+    frame_w, frame_h, (x_offset, y_offset), (x0, y0, x1, y1) = placement
+    patch = _resample(img, frame_w, frame_h, params[2],
+                      (x0 - x_offset, y0 - y_offset, x1 - x_offset, y1 - y_offset))
+    return patch, (x0, y0)
+
+def _composite_layered(img: Image.Image, params: np.ndarray, size: Tuple[int, int],
+                       frame_array: np.ndarray, layers: LayerCache, rotation_step: float = ROTATION_QUANTUM):
+    """
+    Render frames into frame_array from whole resampled layers
+    A layer is the source resampled into its whole frame box; it depends
+    only on the box size and the rotation, snapped to rotation_step.
+    Frames of any animation sharing both take the layer from the cache
+    and just place it differently. At the default step the crop of a
+    layer equals rendering the visible patch directly.
+    """
+    for i, (scale_x, scale_y, rotation, dx, dy, alpha) in enumerate(params):
+        rotation = quantize_rotation(rotation, rotation_step)
+        placement = _frame_placement(img, (scale_x, scale_y, rotation, int(dx), int(dy), alpha), size)
+        if placement is None:
+            continue
+
+        frame_w, frame_h, (x_offset, y_offset), (x0, y0, x1, y1) = placement
+        layer = layers.get((frame_w, frame_h, rotation),
+                           lambda: _resample(img, frame_w, frame_h, rotation, (0, 0, frame_w, frame_h)))
+        frame_array[i, y0:y1, x0:x1] = layer[y0 - y_offset:y1 - y_offset, x0 - x_offset:x1 - x_offset]
+
+def _animation_params(animation_type: str, tween: int = 1, start: int = 0,
+                      stop: Optional[int] = None) -> np.ndarray:
+    """
+    Motion parameters of frames [start, stop) of an animation, as every
+    render path uses them
+    With tween the rotations are snapped to TWEEN_ROTATION_STEP, so
+    in-between frames share layers and streamed sheets match in-memory ones.
+    """
+    config = ANIMATION_CONFIGS.get(animation_type, ANIMATION_CONFIGS['idle'])
+    params = evaluate_transform(config['transform'], config['frames'] * tween, start, stop)
+    if tween > 1:
+        params[:, 2] = [quantize_rotation(rotation, TWEEN_ROTATION_STEP) for rotation in params[:, 2]]
+    return params
+
+def _render_frame_range(img: Optional[Image.Image], animation_type: str, size: Tuple[int, int],
+                        start: int, stop: int, density: int = 1, tween: int = 1,
+                        layers: Optional[LayerCache] = None) -> np.ndarray:
+    """
+    Render frames [start, stop) of an animation into a premultiplied
+    (frames, H, W, 4) array
+    Passing img=None renders from the source (and layer cache) shared with
+    a worker process. With a layer cache, resampled layers are reused
+    across frames and animations; without one each visible patch is
+    resampled on its own.
+    At density N the cells are N times size and motion offsets scale with them.
+    With tween N the loop has N times the configured frames: the keyframed
+    motion is evaluated in between and layers are always shared.
+    """
+    if img is None:
+        img, layers = _WORKER_SOURCE, _WORKER_LAYERS
+    if img.mode != 'RGBa':
+        img = img.convert('RGBa')
+
+    params = _animation_params(animation_type, tween, start, stop)
+    params[:, 3:5] *= density
+    size = (size[0] * density, size[1] * density)
+    frame_array = np.zeros((len(params), size[1], size[0], 4), dtype=np.uint8)
+
+    if tween > 1:
+        _composite_layered(img, params, size, frame_array, layers or LayerCache())
+    elif layers is not None:
+        _composite_layered(img, params, size, frame_array, layers)
+    else:
+        for i, (scale_x, scale_y, rotation, dx, dy, alpha) in enumerate(params):
+            rendered = _composite_frame(img, (scale_x, scale_y, rotation, int(dx), int(dy), alpha), size)
+            if rendered is None:
+                continue
 
-        # Create canvas and paste frame
-        canvas = Image.new('RGBA', size, (0, 0, 0, 0))
-        x_offset = (size[0] - frame.width) // 2 + locals().get('offset_x', 0)
-        y_offset = (size[1] - frame.height) // 2 + locals().get('offset_y', 0)
+            # Cells start out transparent, so the patch can be copied in unmasked
+            patch, (x, y) = rendered
+            frame_array[i, y:y + patch.height, x:x + patch.width] = np.asarray(patch)
 
-        # Ensure offsets are within bounds
-        x_offset = max(0, min(x_offset, size[0] - frame.width))
-        y_offset = max(0, min(y_offset, size[1] - frame.height))
+    # Premultiplied pixels fade by scaling all four channels alike
+    levels = (255 * params[:, 5]).astype(np.uint16)
+    faded = levels < 255
+    if faded.any():
+        frame_array[faded] = frame_array[faded] * levels[faded, None, None, None] // 255
 
-        canvas.paste(frame, (x_offset, y_offset), frame)
-        sprite_sheet.paste(canvas, (i * size[0], 0), canvas)
+    return frame_array
 
-    return sprite_sheet
+def render_animation_frames(img: Image.Image, animation_type: str, size: Tuple[int, int],
+                            density: int = 1, tween: int = 1, layers: Optional[LayerCache] = None) -> np.ndarray:
+    """
+    Render every frame of an animation into one (frames, H, W, 4) uint8 array
+    Pixels are premultiplied RGBa; opacity fades are one multiply per batch
+    """
+    config = ANIMATION_CONFIGS.get(animation_type, ANIMATION_CONFIGS['idle'])
+    return _render_frame_range(img, animation_type, size, 0, config['frames'] * tween, density, tween, layers)
+
+def stream_sprite_sheet(img: Optional[Image.Image], animation_type: str, size: Tuple[int, int],
+                        path: Path, compress_level: int = 6, tween: int = 1) -> Tuple[int, int, int]:
+    """
+    Render an animation's strip sheet band by band straight into a PNG
+    Every scanline crosses all frames, so each band holds a few rows of
+    every frame - about one frame of pixels in total - and memory stays
+    flat however large the sheet gets. Returns (width, height, bytes).
+    """
+    if img is None:
+        img = _WORKER_SOURCE
+    if img.mode != 'RGBa':
+        img = img.convert('RGBa')
+
+    params = _animation_params(animation_type, tween)
+    levels = (255 * params[:, 5]).astype(np.uint16)
+    frames = len(params)
+    band_rows = -(-size[1] // frames)
+
+    writer = PNGStreamWriter(path, size[0] * frames, size[1], compress_level)
+    for top in range(0, size[1], band_rows):
+        bottom = min(size[1], top + band_rows)
+        band = np.zeros((bottom - top, frames, size[0], 4), dtype=np.uint8)
+        for i, (scale_x, scale_y, rotation, dx, dy, _) in enumerate(params):
+            rendered = _composite_frame(img, (scale_x, scale_y, rotation, int(dx), int(dy), 1.0), size,
+                                        rows=(top, bottom))
+            if rendered is None:
+                continue
+            patch, (x, y) = rendered
+            band[y - top:y - top + patch.height, i, x:x + patch.width] = np.asarray(patch)
+            if levels[i] < 255:
+                # Widen first: numpy 1.x keeps uint8 * scalar in uint8 and would wrap
+                band[:, i] = band[:, i].astype(np.uint16) * levels[i] // 255
+        writer.write_rows(_unpremultiply(band.reshape(bottom - top, frames * size[0], 4)))
+
+    return writer.width, writer.height, writer.close()
+
+def _strip_array(frame_array: np.ndarray) -> np.ndarray:
+    """Lay a (frames, H, W, 4) array out as one (H, frames * W, 4) row"""
+    frames, height, width, channels = frame_array.shape
+    return frame_array.transpose(1, 0, 2, 3).reshape(height, frames * width, channels)
+
+def _unpremultiply(image_array: np.ndarray) -> np.ndarray:
+    """Convert premultiplied RGBa pixels back to straight RGBA for encoding"""
+    return np.asarray(Image.fromarray(image_array, 'RGBa').convert('RGBA'))
+
+def frames_to_sheet(frame_array: np.ndarray) -> Image.Image:
+    """Lay a premultiplied (frames, H, W, 4) array out as a single-row RGBA sprite sheet"""
+    return Image.fromarray(_unpremultiply(_strip_array(frame_array)))
+
+def create_sprite_sheet_for_animation(img: Image.Image, animation_type: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Generate a sprite sheet for a specific animation type
+    Uses different transformations based on animation type
+    """
+    return frames_to_sheet(render_animation_frames(img, animation_type, size))
 
-def create_sprite_sheet(image_path, output_path, frames=8, size=(64, 64)):
+def create_sprite_sheet(image_path, output_path, frames=8, size=(64, 64), max_pixels=DEFAULT_MAX_PIXELS):
     """
     Legacy function for backward compatibility
     Generate a single sprite sheet with default idle animation
     """
     print(f"📸 Loading image: {image_path}")
-    img = Image.open(image_path).convert("RGBA")
-    img.thumbnail(size, Image.Resampling.LANCZOS)
+    img = load_image(image_path, size, max_pixels=max_pixels).image
 
     sprite_sheet = create_sprite_sheet_for_animation(img, 'idle', size)
     sprite_sheet.save(output_path)
@@ -239,89 +377,702 @@ def create_sprite_sheet(image_path, output_path, frames=8, size=(64, 64)):
 
     return sprite_sheet.width, sprite_sheet.height
 
-def create_multi_animation_sprites(image_path: str, output_dir: Path, animations: List[str], size: Tuple[int, int]) -> Dict:
+# Source image and its layer cache shared with render worker processes,
+# set by _init_render_worker
+_WORKER_SOURCE = None
+_WORKER_LAYERS = None
+
+def _init_render_worker(mode: str, size: Tuple[int, int], data: bytes, layer_cache_bytes: int = 0):
+    """Rebuild the loaded source from raw pixels once per worker process"""
+    global _WORKER_SOURCE, _WORKER_LAYERS
+    _WORKER_SOURCE = Image.frombytes(mode, size, data)
+    _WORKER_LAYERS = LayerCache(layer_cache_bytes) if layer_cache_bytes > 0 else None
+
+def _create_executor(img: Image.Image, jobs: int, backend: str, layer_cache_bytes: int = 0) -> Executor:
+    """
+    Create a worker pool for sprite rendering
+    Process workers receive the already decoded pixels instead of the file
+    and keep a layer cache of their own
+    """
+    if backend == 'process':
+        return concurrent_futures.ProcessPoolExecutor(max_workers=jobs,
+                                   initializer=_init_render_worker,
+                                   initargs=(img.mode, img.size, img.tobytes(), layer_cache_bytes))
+    if backend == 'thread':
+        return concurrent_futures.ThreadPoolExecutor(max_workers=jobs)
+    raise ValueError(f"Unknown executor backend: {backend}")
+
+def render_animations(img: Image.Image, animations: List[str], size: Tuple[int, int],
+                      executor: Optional[Executor] = None, jobs: int = 1,
+                      shared_source: bool = False, density: int = 1, tween: int = 1,
+                      layers: Optional[LayerCache] = None) -> Dict[str, np.ndarray]:
+    """
+    Render frame batches for several animations, keyed in the given order
+    With an executor, animations are split into frame ranges so that
+    all workers stay busy even when there are fewer animations than jobs.
+    shared_source means workers already hold the source and their own
+    layer cache (process backend); otherwise layers is shared by all.
+    """
+    if executor is None:
+        return {name: render_animation_frames(img, name, size, density, tween, layers) for name in animations}
+
+    chunks_per_animation = max(1, -(-jobs // max(1, len(animations))))
+    task_img = None if shared_source else img
+
+    pending = []
+    for name in animations:
+        frames = ANIMATION_CONFIGS[name]['frames'] * tween
+        bounds = np.linspace(0, frames, min(frames, chunks_per_animation) + 1).astype(int)
+        futures = [executor.submit(_render_frame_range, task_img, name, size, int(start), int(stop), density, tween,
+                                   None if shared_source else layers)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        pending.append((name, futures))
+
+    return {name: np.concatenate([f.result() for f in futures]) for name, futures in pending}
+
+def _downsample_frames(frame_array: np.ndarray, source_density: int, density: int) -> np.ndarray:
+    """
+    Area-average premultiplied frames rendered at source_density down to density
+    All frames go through Pillow as one tall image. Cell edges land on
+    whole target pixels, so neighbouring frames never blend.
+    """
+    frames, height, width, channels = frame_array.shape
+    tall = Image.fromarray(frame_array.reshape(frames * height, width, channels), 'RGBa')
+    if source_density % density == 0:
+        tall = tall.reduce(source_density // density)
+    else:
+        tall = tall.resize((width * density // source_density, frames * height * density // source_density),
+                           Image.Resampling.BOX)
+    return np.asarray(tall).reshape(frames, height * density // source_density, -1, channels)
+
+def density_sprite_name(sprite: str, density: int) -> str:
+    """Sheet filename for a pixel density: sprite_idle.png -> sprite_idle@2x.png"""
+    if density == 1:
+        return sprite
+    stem, dot, extension = sprite.rpartition('.')
+    return f"{stem}@{density}x{dot}{extension}"
+
+@dataclass
+class SpriteOptions:
+    """Output settings that change which sprite files get written"""
+    layout: str = 'strip'  # 'strip': one row per animation, 'grid': rows x columns, 'atlas': shared packed sheets
+    atlas_max_size: int = 2048
+    max_sheet_size: int = 4096  # grid sheets stay within this width/height
+    trim: bool = False  # crop frames to their alpha bounding box
+    dedupe: bool = False  # store pixel-identical frames once
+    encoding: str = 'png'  # 'png', 'png-max', 'palette' or 'webp'
+    byte_budget: Optional[int] = None  # per-pet sprite bytes; over it, colors are reduced
+    densities: Tuple[int, ...] = (1,)  # pixel densities; lower ones are downsampled from the highest
+    stream: bool = False  # write strip sheets band by band instead of holding whole sheets
+    tween: int = 1  # frames rendered per configured frame; in-betweens follow the keyframed motion
+    animated: Tuple[str, ...] = ()  # also export each animation as animated 'webp' and/or 'apng'
+
+    def sprite_name(self, stem: str) -> str:
+        """Sheet filename for the chosen encoding"""
+        return stem + file_extension(self.encoding)
+
+    def stream_conflicts(self) -> List[str]:
+        """Options that need whole sheets in memory and so cannot be streamed"""
+        if not self.stream:
+            return []
+        conflicts = {
+            'layout': self.layout != 'strip',
+            'trim': self.trim,
+            'dedupe': self.dedupe,
+            'encoding': self.encoding not in ('png', 'png-max'),
+            'byte_budget': self.byte_budget is not None,
+            'densities': set(self.densities) != {1},
+            'animated': bool(self.animated),
+        }
+        return [name for name, conflict in conflicts.items() if conflict]
+
+def peak_rss_mb() -> Optional[Tuple[float, float]]:
+    """
+    Peak resident memory of this process and of its largest finished child
+    (e.g. a process-pool worker) in MB, or None where unsupported
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit)
+
+def _animation_metadata(animation_type: str, sprite: str, width: int, height: int, size: Tuple[int, int],
+                        tween: int = 1) -> Dict:
+    """animations.json entry for one rendered animation"""
+    config = ANIMATION_CONFIGS[animation_type]
+    return {
+        'sprite': sprite,
+        'frames': config['frames'] * tween,
+        'duration': config['duration'],
+        'trigger': config['trigger'],
+        'description': config['description'],
+        'width': width,
+        'height': height,
+        'frame_width': size[0],
+        'frame_height': size[1]
+    }
+
+def _sprite_cache_fields(source_hash: str, animation_types: List[str], size: Tuple[int, int],
+                         options: SpriteOptions) -> Dict:
+    """Every input that determines the bytes of one cache unit's sheets"""
+    return {
+        'source': source_hash,
+        'animations': {name: ANIMATION_CONFIGS[name] for name in animation_types},
+        'transforms': {name: describe_transform(ANIMATION_CONFIGS[name]['transform']) for name in animation_types},
+        'size': list(size),
+        'options': asdict(options),
+        'generator': GENERATOR_VERSION,
+        'render_revision': RENDER_REVISION
+    }
+
+def _frame_boxes(frame_array: np.ndarray, trim: bool, density: int = 1) -> List[Tuple[int, int, int, int]]:
+    """
+    (x, y, w, h) of the content kept from each frame
+    With trim, that is the alpha bounding box; fully transparent frames
+    become 0x0 boxes. Frames rendered at a higher density get boxes in 1x
+    pixels, rounded outwards so every density's content fits.
+    """
+    frames, height, width, _ = frame_array.shape
+    if not trim:
+        return [(0, 0, width // density, height // density)] * frames
+
+    opaque = frame_array[..., 3] > 0
+    rows = opaque.any(axis=2)
+    cols = opaque.any(axis=1)
+
+    boxes = []
+    for i in range(frames):
+        if not rows[i].any():
+            boxes.append((0, 0, 0, 0))
+            continue
+        top = int(rows[i].argmax()) // density
+        bottom = -(-(height - int(rows[i][::-1].argmax())) // density)
+        left = int(cols[i].argmax()) // density
+        right = -(-(width - int(cols[i][::-1].argmax())) // density)
+        boxes.append((left, top, right - left, bottom - top))
+    return boxes
+
+def _dedupe_frames(frame_array: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+    """
+    Keep the first copy of every pixel-identical frame
+    Returns the unique frames and, per original frame, its unique index
+    """
+    unique_index = {}
+    keep = []
+    sequence = []
+    for i, frame in enumerate(frame_array):
+        digest = hashlib.blake2b(frame.tobytes(), digest_size=16).digest()
+        if digest not in unique_index:
+            unique_index[digest] = len(keep)
+            keep.append(i)
+        sequence.append(unique_index[digest])
+    return frame_array[keep], sequence
+
+def _playback_fields(sequence: List[int]) -> Dict:
+    """
+    animations.json fields describing how deduplicated frames are played
+    Symmetric animations get a ping-pong flag, others an explicit sequence
+    """
+    unique = max(sequence) + 1
+    if unique == len(sequence):
+        return {}
+    if sequence == list(range(unique)) + list(range(unique - 2, 0, -1)):
+        return {'pingpong': True}
+    return {'frame_sequence': sequence}
+
+def _strip_with_rects(frame_array: np.ndarray, boxes: List[Tuple[int, int, int, int]],
+                      sprite: str, density: int = 1) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Lay (possibly trimmed) frames side by side and return the strip and frame rects
+    Boxes and rects are in 1x pixels; the strip is painted at the frames' density
+    """
+    d = density
+    strip = np.zeros((max(1, max(h for _, _, _, h in boxes)) * d, max(1, sum(w for _, _, w, _ in boxes)) * d, 4),
+                     dtype=np.uint8)
+    rects = []
+    x = 0
+    for frame, (left, top, w, h) in zip(frame_array, boxes):
+        strip[:h * d, x * d:(x + w) * d] = frame[top * d:(top + h) * d, left * d:(left + w) * d]
+        rects.append({'sprite': sprite, 'x': x, 'y': 0, 'w': w, 'h': h, 'ox': left, 'oy': top})
+        x += w
+    return strip, rects
+
+def _layout_strip_sheets(frame_sets: Dict[int, Dict[str, np.ndarray]], output_dir: Path, size: Tuple[int, int],
+                         options: SpriteOptions) -> List[Tuple[Dict, List[Tuple[Path, np.ndarray]]]]:
+    """
+    Lay out one horizontal sheet per animation and density
+    frame_sets maps each density (1x first) to its frame batches.
+    Returns (metadata by animation, [(path, sheet pixels)]) for each animation
+    """
+    top_density = max(frame_sets)
+    units = []
+    for animation_type, top_frames in frame_sets[top_density].items():
+        sprite = options.sprite_name(f"sprite_{animation_type}")
+        boxes = None
+        if options.trim or options.dedupe:
+            boxes = _frame_boxes(top_frames, options.trim, top_density)
+
+        sheets = []
+        frame_rects = None
+        for density, frame_arrays in frame_sets.items():
+            if boxes is not None:
+                strip, frame_rects = _strip_with_rects(frame_arrays[animation_type], boxes, sprite, density)
+            else:
+                strip = _strip_array(frame_arrays[animation_type])
+            sheets.append((output_dir / density_sprite_name(sprite, density), strip))
+
+        height, width = sheets[0][1].shape[:2]
+        metadata = _animation_metadata(animation_type, sprite, width, height, size, options.tween)
+        if frame_rects is not None:
+            metadata['frame_rects'] = frame_rects
+        if len(frame_sets) > 1:
+            metadata['densities'] = list(frame_sets)
+        units.append(({animation_type: metadata}, sheets))
+    return units
+
+def _grid_shape(cells: int, cell_size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    """
+    (columns, rows) for a grid of cells that keeps the sheet within
+    max_size on both sides and as close to square as possible
+    """
+    best = None
+    for columns in range(1, cells + 1):
+        rows = -(-cells // columns)
+        width, height = columns * cell_size[0], rows * cell_size[1]
+        if width > max_size or height > max_size:
+            continue
+        # Longest side first, then fewest empty cells, then fewest rows
+        score = (max(width, height), columns * rows - cells, rows)
+        if best is None or score < best[0]:
+            best = (score, columns, rows)
+
+    if best is None:
+        raise ValueError(f"{cells} frames of {cell_size[0]}x{cell_size[1]} do not fit "
+                         f"a {max_size}x{max_size} sheet")
+    return best[1], best[2]
+
+def _layout_grid_sheets(frame_sets: Dict[int, Dict[str, np.ndarray]], output_dir: Path, size: Tuple[int, int],
+                        options: SpriteOptions) -> List[Tuple[Dict, List[Tuple[Path, np.ndarray]]]]:
+    """
+    Lay out one near-square grid sheet per animation and density
+    Frames fill the cells row by row. The grid is chosen in 1x pixels so
+    that the highest density sheet stays within max_sheet_size; trimmed
+    frames sit in cells of the largest trimmed size and also get frame_rects.
+    """
+    top_density = max(frame_sets)
+    units = []
+    for animation_type, top_frames in frame_sets[top_density].items():
+        sprite = options.sprite_name(f"sprite_{animation_type}")
+        boxes = _frame_boxes(top_frames, options.trim, top_density)
+        cell_w = max(1, max(w for _, _, w, _ in boxes))
+        cell_h = max(1, max(h for _, _, _, h in boxes))
+        columns, rows = _grid_shape(len(boxes), (cell_w, cell_h), options.max_sheet_size // top_density)
+        origins = [((i % columns) * cell_w, (i // columns) * cell_h) for i in range(len(boxes))]
+
+        sheets = []
+        for density, frame_arrays in frame_sets.items():
+            d = density
+            sheet = np.zeros((rows * cell_h * d, columns * cell_w * d, 4), dtype=np.uint8)
+            for frame, (left, top, w, h), (x, y) in zip(frame_arrays[animation_type], boxes, origins):
+                sheet[y * d:(y + h) * d, x * d:(x + w) * d] = frame[top * d:(top + h) * d, left * d:(left + w) * d]
+            sheets.append((output_dir / density_sprite_name(sprite, density), sheet))
+
+        metadata = _animation_metadata(animation_type, sprite, columns * cell_w, rows * cell_h, size, options.tween)
+        metadata['grid'] = {'columns': columns, 'rows': rows, 'cells': len(boxes),
+                            'cell_width': cell_w, 'cell_height': cell_h}
+        if options.trim:
+            metadata['frame_rects'] = [{'sprite': sprite, 'x': x, 'y': y, 'w': w, 'h': h, 'ox': left, 'oy': top}
+                                       for (left, top, w, h), (x, y) in zip(boxes, origins)]
+        if len(frame_sets) > 1:
+            metadata['densities'] = list(frame_sets)
+        units.append(({animation_type: metadata}, sheets))
+    return units
+
+def _layout_atlas_sheets(frame_sets: Dict[int, Dict[str, np.ndarray]], output_dir: Path, size: Tuple[int, int],
+                         options: SpriteOptions) -> List[Tuple[Dict, List[Tuple[Path, np.ndarray]]]]:
+    """
+    Pack the frames of all animations into shared power-of-two atlas pages
+    Each animation's metadata lists the sheet and rect of every frame.
+    Pages are packed in 1x pixels and painted once per density; the
+    highest density page stays within atlas_max_size.
+    """
+    top_density = max(frame_sets)
+    entries = []
+    for name, frame_array in frame_sets[top_density].items():
+        for index, box in enumerate(_frame_boxes(frame_array, options.trim, top_density)):
+            entries.append((name, index, box))
+
+    max_size = next_power_of_two(options.atlas_max_size // top_density + 1) // 2
+    packer = AtlasPacker(max_size=max_size)
+    placements, page_sizes = packer.pack([(w, h) for _, _, (_, _, w, h) in entries])
+
+    frame_rects = {name: [] for name in frame_sets[top_density]}
+    for (name, index, (left, top, w, h)), (page, x, y) in zip(entries, placements):
+        rect = {'sprite': options.sprite_name(f"sprite_atlas_{page}"), 'x': x, 'y': y, 'w': w, 'h': h}
+        if options.trim:
+            rect.update(ox=left, oy=top)
+        frame_rects[name].append(rect)
+
+    files = []
+    for density, frame_arrays in frame_sets.items():
+        d = density
+        pages = [np.zeros((height * d, width * d, 4), dtype=np.uint8) for width, height in page_sizes]
+        for (name, index, (left, top, w, h)), (page, x, y) in zip(entries, placements):
+            pages[page][y * d:(y + h) * d, x * d:(x + w) * d] = \
+                frame_arrays[name][index][top * d:(top + h) * d, left * d:(left + w) * d]
+        files.extend((output_dir / density_sprite_name(options.sprite_name(f"sprite_atlas_{page}"), density),
+                      page_array) for page, page_array in enumerate(pages))
+
+    metadata = {}
+    for name, rects in frame_rects.items():
+        first_page = placements[[e[:2] for e in entries].index((name, 0))][0]
+        width, height = page_sizes[first_page]
+        metadata[name] = _animation_metadata(name, rects[0]['sprite'], width, height, size, options.tween)
+        metadata[name]['frame_rects'] = rects
+        if len(frame_sets) > 1:
+            metadata[name]['densities'] = list(frame_sets)
+
+    print(f"🧩 Atlas: {len(entries)} frames packed into {len(page_sizes)} sheet(s) "
+          f"({', '.join(f'{w}x{h}' for w, h in page_sizes)})")
+    return [(metadata, files)]
+
+def _stream_strip_sheets(img: Image.Image, animations: List[str], output_dir: Path, size: Tuple[int, int],
+                         options: SpriteOptions, executor: Optional[Executor] = None,
+                         shared_source: bool = False) -> Tuple[List[Tuple[Dict, List[Tuple[Path, None]]]], int]:
+    """
+    Stream one strip sheet per animation to disk
+    Returns the layout units like _layout_strip_sheets (without pixels,
+    which are never held whole) and the total bytes written
+    """
+    compress_level = 9 if options.encoding == 'png-max' else 6
+    task_img = None if shared_source and executor is not None else img
+
+    jobs = []
+    for name in animations:
+        sprite = options.sprite_name(f"sprite_{name}")
+        args = (task_img, name, size, output_dir / sprite, compress_level, options.tween)
+        jobs.append((name, sprite, executor.submit(stream_sprite_sheet, *args) if executor else args))
+
+    units = []
+    total = 0
+    for name, sprite, job in jobs:
+        width, height, written = job.result() if executor else stream_sprite_sheet(*job)
+        total += written
+        units.append(({name: _animation_metadata(name, sprite, width, height, size, options.tween)},
+                      [(output_dir / sprite, None)]))
+    return units, total
+
+def _frame_durations(duration: float, frames: int) -> List[int]:
+    """Per-frame delays in ms that add up to the animation's duration"""
+    ends = np.round(np.linspace(0, duration * 1000, frames + 1)).astype(int)
+    return np.diff(ends).tolist()
+
+def _export_animations(frame_arrays: Dict[str, np.ndarray], sequences: Dict[str, List[int]], output_dir: Path,
+                       options: SpriteOptions, executor: Optional[Executor] = None) -> Tuple[Dict[str, Dict], int]:
+    """
+    Write every animation as a self-contained animated image per format
+    Uses the already rendered 1x frames, put back in playback order when
+    they were deduped. Returns file names by animation and format, and
+    the total bytes written.
+    """
+    files = {}
+    jobs = []
+    for name, frame_array in frame_arrays.items():
+        frames, height, width, channels = frame_array.shape
+        straight = _unpremultiply(frame_array.reshape(frames * height, width, channels)).reshape(frame_array.shape)
+        if name in sequences:
+            straight = straight[sequences[name]]
+        durations = _frame_durations(ANIMATION_CONFIGS[name]['duration'], len(straight))
+
+        files[name] = {}
+        for fmt in options.animated:
+            files[name][fmt] = f"animated_{name}{animated_extension(fmt)}"
+            jobs.append((straight, durations, output_dir / files[name][fmt], fmt))
+
+    if executor is None:
+        sizes = [encode_animation(*job) for job in jobs]
+    else:
+        sizes = [future.result() for future in [executor.submit(encode_animation, *job) for job in jobs]]
+    return files, sum(sizes)
+
+def create_multi_animation_sprites(image_path: str, output_dir: Path, animations: List[str], size: Tuple[int, int],
+                                   jobs: int = 1, executor: str = 'thread',
+                                   cache: Optional[SpriteCache] = None,
+                                   options: Optional[SpriteOptions] = None,
+                                   max_pixels: Optional[int] = DEFAULT_MAX_PIXELS,
+                                   layer_cache_bytes: int = DEFAULT_LAYER_CACHE_BYTES) -> Dict:
     """
     Generate multiple sprite sheets for different animation types
     Returns metadata for all generated animations
+    With jobs > 1, rendering and sheet encoding run on a thread or process pool.
+    With a cache, sheets already rendered from the same inputs are reused
+    and the image is only decoded if something is missing, at about the
+    size it is rendered at.
+    Resampled layers are memoized across animations in up to
+    layer_cache_bytes of memory (per worker with the process backend);
+    0 resamples every frame on its own.
     """
-    print(f"📸 Loading image: {image_path}")
-    img = Image.open(image_path).convert("RGBA")
-    img.thumbnail(size, Image.Resampling.LANCZOS)
-
-    animations_metadata = {}
+    options = options or SpriteOptions()
+    options = replace(options, encoding=resolve_encoding(options.encoding),
+                      animated=resolve_animated_formats(options.animated))
+    if options.stream_conflicts():
+        raise ValueError(f"Streamed sheets cannot be combined with: {', '.join(options.stream_conflicts())}")
 
+    selected = []
     for animation_type in animations:
         if animation_type not in ANIMATION_CONFIGS:
             print(f"⚠️  Unknown animation type: {animation_type}, skipping...")
             continue
+        selected.append(animation_type)
 
-        config = ANIMATION_CONFIGS[animation_type]
-        print(f"🎞️  Generating {animation_type} animation ({config['frames']} frames)...")
-
-        sprite_sheet = create_sprite_sheet_for_animation(img, animation_type, size)
-        sprite_filename = f"sprite_{animation_type}.png"
-        sprite_path = output_dir / sprite_filename
-        sprite_sheet.save(sprite_path)
-
-        animations_metadata[animation_type] = {
-            'sprite': sprite_filename,
-            'frames': config['frames'],
-            'duration': config['duration'],
-            'trigger': config['trigger'],
-            'description': config['description'],
-            'width': sprite_sheet.width,
-            'height': sprite_sheet.height,
-            'frame_width': size[0],
-            'frame_height': size[1]
-        }
-
-        print(f"✅ {animation_type}: {sprite_filename}")
-
-    return animations_metadata
+    # Strip sheets are cached per animation, an atlas as a whole; so are
+    # sheets sharing a palette or a byte budget
+    if options.layout == 'atlas' or options.encoding == 'palette' or options.byte_budget is not None:
+        cache_units = [selected] if selected else []
+    else:
+        cache_units = [[name] for name in selected]
+
+    cached_metadata = {}
+    cache_keys = {}
+    if cache is not None:
+        source_hash = cache.hash_file(image_path)
+        for unit in cache_units:
+            key = cache.make_key(_sprite_cache_fields(source_hash, unit, size, options))
+            cache_keys[tuple(unit)] = key
+            metadata = cache.fetch(key, output_dir)
+            if metadata is not None:
+                cached_metadata.update(metadata)
+
+    to_render = [name for name in selected if name not in cached_metadata]
+    animations_metadata = {}
 
-def generate_web_version(config, sprite_info, output_dir):
-    """Generate standalone HTML version"""
-    print("🌐 Generating web version...")
+    if to_render:
+        # Render once at the highest density; lower densities are
+        # area-averaged from it instead of rendered again
+        densities = sorted(set(options.densities) | {1})
+        top_density = densities[-1]
+
+        # Fitted into the frame at 1x, then scaled up to the top density
+        print(f"📸 Loading image: {image_path}")
+        loaded = load_image(image_path, size, scale=top_density, max_pixels=max_pixels)
+        img = loaded.image
+        if img.size != loaded.source_size:
+            print(f"🪶 Decoded {loaded.source_size[0]}x{loaded.source_size[1]} as {img.width}x{img.height}")
+        # Frames are rendered premultiplied from here until encoding
+        img = img.convert("RGBa")
+
+        for animation_type in to_render:
+            config = ANIMATION_CONFIGS[animation_type]
+            print(f"🎞️  Generating {animation_type} animation ({config['frames'] * options.tween} frames)...")
+
+        # Streamed bands only ever resample the rows they need
+        if options.stream:
+            layer_cache_bytes = 0
+        layers = LayerCache(layer_cache_bytes) if layer_cache_bytes > 0 else None
+
+        pool = _create_executor(img, jobs, executor, layer_cache_bytes) if jobs > 1 else None
+        sequences = {}
+        animated_files = {}
+        try:
+            if options.stream:
+                laid_out, streamed_bytes = _stream_strip_sheets(img, to_render, output_dir, size, options, pool,
+                                                                shared_source=executor == 'process')
+            else:
+                frame_arrays = render_animations(img, to_render, size, executor=pool, jobs=jobs,
+                                                 shared_source=executor == 'process', density=top_density,
+                                                 tween=options.tween, layers=layers)
+
+                if options.dedupe:
+                    rendered_frames = sum(len(a) for a in frame_arrays.values())
+                    for name in frame_arrays:
+                        frame_arrays[name], sequences[name] = _dedupe_frames(frame_arrays[name])
+                    unique_frames = sum(len(a) for a in frame_arrays.values())
+                    print(f"🔁 Dedupe: {rendered_frames} frames → {unique_frames} unique")
+
+                frame_sets = {density: {name: _downsample_frames(a, top_density, density)
+                                        for name, a in frame_arrays.items()}
+                              for density in densities[:-1]}
+                frame_sets[top_density] = frame_arrays
+                if len(densities) > 1:
+                    print(f"🔍 Densities: rendered at {top_density}x, "
+                          f"downsampled to {', '.join(f'{d}x' for d in densities[:-1])}")
+
+                if options.layout == 'atlas':
+                    laid_out = _layout_atlas_sheets(frame_sets, output_dir, size, options)
+                elif options.layout == 'grid':
+                    laid_out = _layout_grid_sheets(frame_sets, output_dir, size, options)
+                else:
+                    laid_out = _layout_strip_sheets(frame_sets, output_dir, size, options)
+
+                # Back to straight alpha once, for the encoder
+                sheets = [(path, _unpremultiply(sheet))
+                          for _, unit_sheets in laid_out for path, sheet in unit_sheets]
+                report = encode_sheets(sheets, options.encoding, options.byte_budget, pool)
+
+                # Animated exports reuse the same frames; nothing is rendered twice
+                if options.animated:
+                    animated_files, animated_bytes = _export_animations(frame_sets[1], sequences, output_dir,
+                                                                        options, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        if options.trim:
+            full_area = sum(a.shape[0] * a.shape[1] * a.shape[2] for a in frame_sets[1].values())
+            kept_area = sum(r['w'] * r['h'] for unit_metadata, _ in laid_out
+                            for m in unit_metadata.values() for r in m['frame_rects'])
+            print(f"✂️  Trim: kept {kept_area / full_area:.0%} of frame pixel area")
+
+        if options.stream:
+            print(f"📦 Sprites ({options.encoding}, streamed): {streamed_bytes / 1024:.1f} KB")
+        else:
+            palette_note = f", {report['colors']} colors" if report['colors'] else ''
+            print(f"📦 Sprites ({report['encoding']}{palette_note}): "
+                  f"{report['baseline_bytes'] / 1024:.1f} KB as plain PNG → {report['bytes'] / 1024:.1f} KB")
+        if layers is not None and not (pool is not None and executor == 'process'):
+            stats = layers.get_stats()
+            print(f"🧩 Layer cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate), {stats['bytes'] / (1024 * 1024):.1f} MB"
+                  + (f", {stats['evictions']} evicted" if stats['evictions'] else ''))
+        if animated_files:
+            print(f"🎬 Animated ({', '.join(options.animated)}): "
+                  f"{sum(len(f) for f in animated_files.values())} files, {animated_bytes / 1024:.1f} KB")
+
+        peak = peak_rss_mb()
+        if peak is not None:
+            worker_note = f", largest worker {peak[1]:.0f} MB" if pool is not None and executor == 'process' else ''
+            print(f"🧠 Peak RSS: {peak[0]:.0f} MB{worker_note}")
+
+        # Regroup per-animation sheets into the units they are cached as
+        written = []
+        for unit in cache_units:
+            parts = [(m, unit_sheets) for m, unit_sheets in laid_out if next(iter(m)) in unit]
+            if parts:
+                written.append(({name: data for m, _ in parts for name, data in m.items()},
+                                [sheet for _, unit_sheets in parts for sheet in unit_sheets]))
+
+        for unit_metadata, unit_sheets in written:
+            unit_files = [path for path, _ in unit_sheets]
+            for name in unit_metadata:
+                if name in sequences:
+                    unit_metadata[name].update(_playback_fields(sequences[name]))
+                if name in animated_files:
+                    unit_metadata[name]['animated'] = animated_files[name]
+                    unit_files.extend(output_dir / filename for filename in animated_files[name].values())
+            animations_metadata.update(unit_metadata)
+            if cache is not None:
+                cache.store(cache_keys[tuple(unit_metadata)], unit_files, unit_metadata)
+
+    # Metadata follows the requested order regardless of completion order
+    for animation_type in selected:
+        if animation_type in cached_metadata:
+            animations_metadata[animation_type] = cached_metadata[animation_type]
+            print(f"♻️  {animation_type}: {cached_metadata[animation_type]['sprite']} (cached)")
+        else:
+            print(f"✅ {animation_type}: {animations_metadata[animation_type]['sprite']}")
+    animations_metadata = {name: animations_metadata[name] for name in selected}
 
-    template_path = Path(__file__).parent.parent / "templates" / "web" / "index.html"
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template = f.read()
+    if cache is not None:
+        stats = cache.get_stats()
+        print(f"🗃️  Sprite cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate)")
 
-    # Replace placeholders
-    html = template.replace('{{PET_NAME}}', config['name'])
+    return animations_metadata
 
-    # Handle multi-animation or legacy mode
+def _sprite_files(animations: Dict) -> List[str]:
+    """Unique sprite files referenced by animations.json entries, in order"""
+    files = []
+    for anim_data in animations.values():
+        for sprite in [anim_data['sprite']] + [rect['sprite'] for rect in anim_data.get('frame_rects', [])]:
+            for density in anim_data.get('densities', [1]):
+                name = density_sprite_name(sprite, density)
+                if name not in files:
+                    files.append(name)
+    return files
+
+def _sprite_output_files(animations: Dict) -> List[str]:
+    """Every file create_multi_animation_sprites wrote for these animations"""
+    files = _sprite_files(animations)
+    for anim_data in animations.values():
+        files.extend(name for name in anim_data.get('animated', {}).values() if name not in files)
+    return files
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+# Placeholders the output modes fill in; template_engine.py flags others
+TEMPLATE_PLACEHOLDERS = ('PET_NAME', 'ANIMATIONS_CONFIG', 'SPRITE_WIDTH', 'FRAME_WIDTH', 'FRAME_COUNT',
+                         'EVENT_LISTENERS')
+
+def read_template(kind: str, name: str) -> str:
+    """Text of templates/<kind>/<name>"""
+    return template_bytes(TEMPLATES_DIR / kind / name).decode('utf-8')
+
+def render_template(kind: str, name: str, values: Dict[str, str]) -> str:
+    """templates/<kind>/<name> with its placeholders filled in from values"""
+    return load_template(TEMPLATES_DIR / kind / name).render(values)
+
+def template_values(config, sprite_info) -> Dict[str, str]:
+    """Placeholder values shared by the web, extension and desktop templates"""
     if isinstance(sprite_info, dict) and 'animations' in sprite_info:
-        # Multi-animation mode
-        animations_json = json.dumps(sprite_info['animations'], ensure_ascii=False, indent=2)
-        html = html.replace('{{ANIMATIONS_CONFIG}}', animations_json)
-
-        # Use first animation's info for basic placeholders
-        first_anim = list(sprite_info['animations'].values())[0]
-        html = html.replace('{{SPRITE_WIDTH}}', str(first_anim['width']))
-        html = html.replace('{{FRAME_WIDTH}}', str(first_anim['frame_width']))
-        html = html.replace('{{FRAME_COUNT}}', str(first_anim['frames']))
+        # Multi-animation mode; basic placeholders use the first animation
+        animations_config = json.dumps(sprite_info['animations'], ensure_ascii=False, indent=2)
+        sheet = list(sprite_info['animations'].values())[0]
     else:
         # Legacy single sprite mode
-        html = html.replace('{{ANIMATIONS_CONFIG}}', 'null')
-        html = html.replace('{{SPRITE_WIDTH}}', str(sprite_info['width']))
-        html = html.replace('{{FRAME_WIDTH}}', str(sprite_info['frame_width']))
-        html = html.replace('{{FRAME_COUNT}}', str(sprite_info['frames']))
+        animations_config = 'null'
+        sheet = sprite_info
+    return {
+        'PET_NAME': config['name'],
+        'ANIMATIONS_CONFIG': animations_config,
+        'SPRITE_WIDTH': str(sheet['width']),
+        'FRAME_WIDTH': str(sheet['frame_width']),
+        'FRAME_COUNT': str(sheet['frames']),
+        'EVENT_LISTENERS': '// Custom event listeners can be added here'
+    }
+
+def _template_digests(kind: str) -> Dict[str, str]:
+    """Content hashes of one output mode's template files, so template edits trigger a rebuild"""
+    template_dir = TEMPLATES_DIR / kind
+    return {path.name: hashlib.sha256(template_bytes(path)).hexdigest()
+            for path in sorted(template_dir.iterdir()) if path.is_file()}
+
+def generate_web_version(config, sprite_info, output_dir) -> List[Path]:
+    """Generate standalone HTML version; returns the files written"""
+    say("🌐 Generating web version...")
 
-    # Replace event listeners placeholder
-    html = html.replace('{{EVENT_LISTENERS}}', '// Custom event listeners can be added here')
+    html = render_template('web', 'index.html', template_values(config, sprite_info))
 
     output_file = output_dir / "index.html"
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(html)
 
-    print(f"✅ Web version: {output_file}")
+    say(f"✅ Web version: {output_file}")
+    return [output_file]
+
+def _publish_sprites(sprite_info, output_dir: Path, dest_dir: Path,
+                     publisher: Optional[AssetPublisher] = None) -> List[Path]:
+    """Link or copy the sprite sheets (and animations.json) into an output mode's folder"""
+    publisher = publisher or AssetPublisher()
+    if isinstance(sprite_info, dict) and 'animations' in sprite_info:
+        # Multi-animation mode
+        names = [sprite for sprite in _sprite_files(sprite_info['animations']) if (output_dir / sprite).exists()]
+        if (output_dir / "animations.json").exists():
+            names.append("animations.json")
+    else:
+        # Legacy single sprite mode
+        names = ["sprite.png"]
+
+    for name in names:
+        publisher.publish(output_dir / name, dest_dir / name)
+    return [dest_dir / name for name in names]
 
 def create_extension_zip(ext_dir: Path, zip_path: Path):
     """
     Create a zip file of the browser extension directory
     """
-    print(f"📦 Creating extension package...")
+    say(f"📦 Creating extension package...")
 
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
         # Walk through the extension directory
@@ -330,22 +1081,27 @@ def create_extension_zip(ext_dir: Path, zip_path: Path):
                 file_path = Path(root) / file
                 # Calculate the archive name (relative path from ext_dir)
                 arcname = file_path.relative_to(ext_dir.parent)
-                zipf.write(file_path, arcname)
+                info = zipfile.ZipInfo.from_file(file_path, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # Sheets linked from the sprite cache are read-only; ship them writable
+                info.external_attr |= 0o200 << 16
+                with open(file_path, 'rb') as src, zipf.open(info, 'w') as dest:
+                    shutil.copyfileobj(src, dest, 1024 * 8)
 
-    print(f"✅ Extension packaged: {zip_path}")
+    say(f"✅ Extension packaged: {zip_path}")
 
-def generate_extension_version(config, sprite_info, output_dir):
-    """Generate browser extension version"""
-    print("🧩 Generating browser extension...")
+def generate_extension_version(config, sprite_info, output_dir,
+                               publisher: Optional[AssetPublisher] = None) -> List[Path]:
+    """Generate browser extension version; returns the files written"""
+    say("🧩 Generating browser extension...")
 
     ext_dir = output_dir / "extension"
     ext_dir.mkdir(exist_ok=True)
 
-    template_dir = Path(__file__).parent.parent / "templates" / "extension"
+    template_dir = TEMPLATES_DIR / "extension"
 
     # Copy and process manifest
-    with open(template_dir / "manifest.json", 'r') as f:
-        manifest = json.load(f)
+    manifest = json.loads(read_template('extension', 'manifest.json'))
 
     manifest['name'] = f"{config['name']} Desktop Pet"
     manifest['description'] = f"Your personal {config['name']} companion"
@@ -354,64 +1110,61 @@ def generate_extension_version(config, sprite_info, output_dir):
         json.dump(manifest, f, indent=2)
 
     # Process and copy content script with placeholder replacement
-    with open(template_dir / "content.js", 'r', encoding='utf-8') as f:
-        content_js = f.read()
-
-    content_js = content_js.replace('{{PET_NAME}}', config['name'])
-
-    # Handle animations config
-    if isinstance(sprite_info, dict) and 'animations' in sprite_info:
-        animations_json = json.dumps(sprite_info['animations'], ensure_ascii=False, indent=2)
-        content_js = content_js.replace('{{ANIMATIONS_CONFIG}}', animations_json)
-
-        # Use first animation's info for basic placeholders
-        first_anim = list(sprite_info['animations'].values())[0]
-        content_js = content_js.replace('{{SPRITE_WIDTH}}', str(first_anim['width']))
-        content_js = content_js.replace('{{FRAME_WIDTH}}', str(first_anim['frame_width']))
-        content_js = content_js.replace('{{FRAME_COUNT}}', str(first_anim['frames']))
-    else:
-        content_js = content_js.replace('{{ANIMATIONS_CONFIG}}', 'null')
-        content_js = content_js.replace('{{SPRITE_WIDTH}}', str(sprite_info['width']))
-        content_js = content_js.replace('{{FRAME_WIDTH}}', str(sprite_info['frame_width']))
-        content_js = content_js.replace('{{FRAME_COUNT}}', str(sprite_info['frames']))
-
-    # Replace event listeners placeholder
-    content_js = content_js.replace('{{EVENT_LISTENERS}}', '// Custom event listeners can be added here')
+    content_js = render_template('extension', 'content.js', template_values(config, sprite_info))
 
     with open(ext_dir / "content.js", 'w', encoding='utf-8') as f:
         f.write(content_js)
 
     shutil.copy(template_dir / "popup.html", ext_dir / "popup.html")
     shutil.copy(template_dir / "popup.js", ext_dir / "popup.js")
+    written = [ext_dir / name for name in ("manifest.json", "content.js", "popup.html", "popup.js")]
 
-    # Copy sprite(s)
-    if isinstance(sprite_info, dict) and 'animations' in sprite_info:
-        # Multi-animation mode
-        for anim_name, anim_data in sprite_info['animations'].items():
-            sprite_file = output_dir / anim_data['sprite']
-            if sprite_file.exists():
-                shutil.copy(sprite_file, ext_dir / anim_data['sprite'])
-        # Copy animations config
-        if (output_dir / "animations.json").exists():
-            shutil.copy(output_dir / "animations.json", ext_dir / "animations.json")
-    else:
-        # Legacy single sprite mode
-        shutil.copy(output_dir / "sprite.png", ext_dir / "sprite.png")
+    written.extend(_publish_sprites(sprite_info, output_dir, ext_dir, publisher))
 
     # Create zip file automatically
     zip_path = output_dir / "extension.zip"
     create_extension_zip(ext_dir, zip_path)
 
-    print(f"✅ Extension: {ext_dir}")
-    print(f"✅ Package: {zip_path}")
+    say(f"✅ Extension: {ext_dir}")
+    say(f"✅ Package: {zip_path}")
+    return written + [zip_path]
+
+def _stream_command(command: List[str], cwd: Path, timeout: float) -> int:
+    """
+    Run a command, printing its output line by line as it arrives
+    Returns the exit status; raises subprocess.TimeoutExpired (after
+    killing the command) when it runs longer than timeout seconds.
+    """
+    label = ' '.join(command[:2])
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, errors='replace')
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            if line.strip():
+                say(f"   [{label}] {line.rstrip()}")
+        status = process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+    return status
 
 def package_desktop_app(desktop_dir: Path, config: dict) -> bool:
     """
     Automatically package the desktop app using electron-builder
     Returns True if packaging succeeded, False otherwise
     """
-    print(f"\n📦 Packaging desktop app...")
-    print(f"{'='*50}")
+    say(f"\n📦 Packaging desktop app...")
+    say(f"{'='*50}")
 
     try:
         # Check if npm is available
@@ -420,108 +1173,93 @@ def package_desktop_app(desktop_dir: Path, config: dict) -> bool:
                                    text=True,
                                    timeout=10)
         if npm_check.returncode != 0:
-            print("⚠️  npm not found. Skipping automatic packaging.")
-            print("   Install Node.js to enable automatic packaging.")
+            say("⚠️  npm not found. Skipping automatic packaging.")
+            say("   Install Node.js to enable automatic packaging.")
             return False
 
-        print(f"📥 Installing dependencies...")
-        install_result = subprocess.run(
-            ['npm', 'install'],
-            cwd=desktop_dir,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutes timeout
-        )
-
-        if install_result.returncode != 0:
-            print(f"⚠️  npm install failed:")
-            print(install_result.stderr)
+        say(f"📥 Installing dependencies...")
+        install_status = _stream_command(['npm', 'install'], desktop_dir,
+                                         timeout=300)  # 5 minutes timeout
+
+        if install_status != 0:
+            say(f"⚠️  npm install failed (exit status {install_status})")
             return False
 
-        print(f"✅ Dependencies installed")
+        say(f"✅ Dependencies installed")
 
         # Build portable version (cross-platform)
-        print(f"🔨 Building portable executable...")
-        build_result = subprocess.run(
-            ['npm', 'run', 'build'],
-            cwd=desktop_dir,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minutes timeout
-        )
-
-        if build_result.returncode != 0:
-            print(f"⚠️  Build failed:")
-            print(build_result.stderr)
+        say(f"🔨 Building portable executable...")
+        build_status = _stream_command(['npm', 'run', 'build'], desktop_dir,
+                                       timeout=600)  # 10 minutes timeout
+
+        if build_status != 0:
+            say(f"⚠️  Build failed (exit status {build_status})")
             return False
 
         # Check for generated files
         dist_dir = desktop_dir / "dist"
         if not dist_dir.exists():
-            print(f"⚠️  dist directory not found after build")
+            say(f"⚠️  dist directory not found after build")
             return False
 
         # List generated files
         built_files = list(dist_dir.glob("*"))
         if built_files:
-            print(f"✅ Desktop app packaged successfully!")
-            print(f"\n📂 Packaged files in {dist_dir}:")
+            say(f"✅ Desktop app packaged successfully!")
+            say(f"\n📂 Packaged files in {dist_dir}:")
             for file in built_files:
                 size = file.stat().st_size if file.is_file() else "dir"
                 size_str = f"{size:,} bytes" if isinstance(size, int) else size
-                print(f"   • {file.name} ({size_str})")
+                say(f"   • {file.name} ({size_str})")
             return True
         else:
-            print(f"⚠️  No files generated in dist directory")
+            say(f"⚠️  No files generated in dist directory")
             return False
 
     except subprocess.TimeoutExpired:
-        print(f"⚠️  Packaging timed out")
+        say(f"⚠️  Packaging timed out")
         return False
     except FileNotFoundError:
-        print(f"⚠️  npm not found. Skipping automatic packaging.")
-        print(f"   Install Node.js to enable automatic packaging.")
+        say(f"⚠️  npm not found. Skipping automatic packaging.")
+        say(f"   Install Node.js to enable automatic packaging.")
         return False
     except Exception as e:
-        print(f"⚠️  Packaging error: {e}")
+        say(f"⚠️  Packaging error: {e}")
         return False
 
-def generate_desktop_version(config, sprite_info, output_dir, auto_package=True):
-    """Generate Electron desktop app version"""
-    print("🖥️  Generating desktop app...")
+def generate_desktop_version(config, sprite_info, output_dir, auto_package=True,
+                             publisher: Optional[AssetPublisher] = None) -> List[Path]:
+    """Generate Electron desktop app version; returns the files written"""
+    written = _write_desktop_app(config, sprite_info, output_dir, publisher)
+
+    # Automatically package if enabled
+    if auto_package:
+        package_success = package_desktop_app(output_dir / "desktop-app", config)
+        if not package_success:
+            say("   📦 Manual build: cd desktop-app && npm install && npm run build")
+    else:
+        say("   📦 Build: cd desktop-app && npm install && npm run build")
+    return written
+
+def _write_desktop_app(config, sprite_info, output_dir, publisher: Optional[AssetPublisher] = None) -> List[Path]:
+    """Write the Electron app sources and sprites, without packaging"""
+    say("🖥️  Generating desktop app...")
 
     desktop_dir = output_dir / "desktop-app"
     desktop_dir.mkdir(exist_ok=True)
 
-    template_dir = Path(__file__).parent.parent / "templates" / "desktop"
+    template_dir = TEMPLATES_DIR / "desktop"
 
     # Copy Electron files (except renderer.js and index.html which need processing)
+    written = [desktop_dir / 'renderer.js']
     for file in ['main.js', 'package.json']:
         src = template_dir / file
         if src.exists():
             shutil.copy(src, desktop_dir / file)
+            written.append(desktop_dir / file)
 
     # Process renderer.js with placeholder replacement
-    with open(template_dir / 'renderer.js', 'r', encoding='utf-8') as f:
-        renderer_js = f.read()
-
-    renderer_js = renderer_js.replace('{{PET_NAME}}', config['name'])
-
-    if isinstance(sprite_info, dict) and 'animations' in sprite_info:
-        animations_json = json.dumps(sprite_info['animations'], ensure_ascii=False, indent=2)
-        renderer_js = renderer_js.replace('{{ANIMATIONS_CONFIG}}', animations_json)
-
-        first_anim = list(sprite_info['animations'].values())[0]
-        renderer_js = renderer_js.replace('{{SPRITE_WIDTH}}', str(first_anim['width']))
-        renderer_js = renderer_js.replace('{{FRAME_WIDTH}}', str(first_anim['frame_width']))
-        renderer_js = renderer_js.replace('{{FRAME_COUNT}}', str(first_anim['frames']))
-    else:
-        renderer_js = renderer_js.replace('{{ANIMATIONS_CONFIG}}', 'null')
-        renderer_js = renderer_js.replace('{{SPRITE_WIDTH}}', str(sprite_info['width']))
-        renderer_js = renderer_js.replace('{{FRAME_WIDTH}}', str(sprite_info['frame_width']))
-        renderer_js = renderer_js.replace('{{FRAME_COUNT}}', str(sprite_info['frames']))
-
-    renderer_js = renderer_js.replace('{{EVENT_LISTENERS}}', '// Custom event listeners can be added here')
+    renderer_js = render_template('desktop', 'renderer.js', template_values(config, sprite_info))
 
     with open(desktop_dir / 'renderer.js', 'w', encoding='utf-8') as f:
         f.write(renderer_js)
@@ -529,6 +1267,7 @@ def generate_desktop_version(config, sprite_info, output_dir, auto_package=True)
     # Process index.html if needed
     if (template_dir / 'index.html').exists():
         shutil.copy(template_dir / 'index.html', desktop_dir / 'index.html')
+        written.append(desktop_dir / 'index.html')
 
     # Update package.json with pet name
     pkg_path = desktop_dir / "package.json"
@@ -541,32 +1280,13 @@ def generate_desktop_version(config, sprite_info, output_dir, auto_package=True)
     with open(pkg_path, 'w') as f:
         json.dump(pkg, f, indent=2)
 
-    # Copy sprite(s)
-    if isinstance(sprite_info, dict) and 'animations' in sprite_info:
-        # Multi-animation mode
-        for anim_name, anim_data in sprite_info['animations'].items():
-            sprite_file = output_dir / anim_data['sprite']
-            if sprite_file.exists():
-                shutil.copy(sprite_file, desktop_dir / anim_data['sprite'])
-        # Copy animations config
-        if (output_dir / "animations.json").exists():
-            shutil.copy(output_dir / "animations.json", desktop_dir / "animations.json")
-    else:
-        # Legacy single sprite mode
-        shutil.copy(output_dir / "sprite.png", desktop_dir / "sprite.png")
-
-    print(f"✅ Desktop app: {desktop_dir}")
+    written.extend(_publish_sprites(sprite_info, output_dir, desktop_dir, publisher))
 
-    # Automatically package if enabled
-    if auto_package:
-        package_success = package_desktop_app(desktop_dir, config)
-        if not package_success:
-            print("   📦 Manual build: cd desktop-app && npm install && npm run build")
-    else:
-        print("   📦 Build: cd desktop-app && npm install && npm run build")
+    say(f"✅ Desktop app: {desktop_dir}")
+    return written
 
-def generate_readme(config, output_dir, has_multi_animations=False):
-    """Generate README with instructions"""
+def generate_readme(config, output_dir, has_multi_animations=False) -> List[Path]:
+    """Generate README with instructions; returns the files written"""
     animations_section = ""
     if has_multi_animations:
         animations_section = f"""
@@ -653,9 +1373,11 @@ Made with ❤️ by Desktop Pet Generator
     with open(output_dir / "README.md", 'w', encoding='utf-8') as f:
         f.write(readme_content)
 
-    print(f"✅ README.md created")
+    say(f"✅ README.md created")
+    return [output_dir / "README.md"]
 
-def main():
+def _build_parser() -> argparse.ArgumentParser:
+    """Command line options; batch manifest lines may set any of them per pet"""
     parser = argparse.ArgumentParser(
         description='Desktop Pet Generator - Create animated desktop pets with multiple animations',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -673,6 +1395,9 @@ Examples:
   python pet_generator.py --image bear.png --name "小熊" \\
     --animations idle,walk,jump,happy,pet --output ./my-pet
 
+  # Many pets in one process, two at a time
+  python pet_generator.py --batch pets.jsonl --batch-jobs 2 --output ./pets
+
 Animation presets:
   core     : idle, walk, jump (3 animations)
   standard : idle, walk, jump, happy, pet, sleep, eat (7 animations)
@@ -682,7 +1407,7 @@ Available animations:
   idle, walk, jump, happy, pet, sleep, eat, attack, hurt, death
         """
     )
-    parser.add_argument('--image', required=True, help='Path to input image')
+    parser.add_argument('--image', help='Path to input image (required unless --batch)')
     parser.add_argument('--name', default='My Pet', help='Pet name')
     parser.add_argument('--output', default='./output', help='Output directory')
     parser.add_argument('--animations', default=None,
@@ -692,19 +1417,86 @@ Available animations:
     parser.add_argument('--modes', default='web,extension,desktop', help='Generation modes (comma-separated)')
     parser.add_argument('--no-package', action='store_true',
                         help='Skip automatic packaging of desktop app (default: auto-package enabled)')
-
-    args = parser.parse_args()
-
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Parallel workers for sprite rendering (default: 1)')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help='Worker backend used with --jobs (default: thread)')
+    parser.add_argument('--layout', choices=['strip', 'grid', 'atlas'], default='strip',
+                        help='Sprite layout: one row per animation, a near-square grid per animation, '
+                             'or all frames packed into atlas sheets')
+    parser.add_argument('--atlas-max-size', type=int, default=2048,
+                        help='Maximum atlas sheet width/height, a power of two (default: 2048)')
+    parser.add_argument('--max-sheet-size', type=int, default=4096,
+                        help='Maximum grid sheet width/height in pixels (default: 4096)')
+    parser.add_argument('--trim', action='store_true',
+                        help='Crop frames to their visible pixels and store offsets in animations.json')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Store identical frames once and record the playback order in animations.json')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='png',
+                        help='Sheet encoding: png, png-max (max compression), palette '
+                             '(8-bit PNG, one palette per pet) or webp (lossless) (default: png)')
+    parser.add_argument('--byte-budget-kb', type=float, default=None,
+                        help='Per-pet sprite size budget; colors are reduced until the sheets fit')
+    parser.add_argument('--densities', default='1',
+                        help='Pixel densities to generate, e.g. 1,2,3 for HiDPI screens (default: 1)')
+    parser.add_argument('--animated', default='',
+                        help='Also export each animation as a self-contained animated image: '
+                             'comma-separated webp and/or apng')
+    parser.add_argument('--tween', type=int, default=1,
+                        help='Frames per configured frame, e.g. 3 turns 8-frame loops into 24 (default: 1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write strip sheets band by band so memory stays at about one frame '
+                             '(png/png-max strips only)')
+    parser.add_argument('--layer-cache-mb', type=float, default=DEFAULT_LAYER_CACHE_BYTES / (1024 * 1024),
+                        help='Memory for resampled layers shared between animations, 0 to disable '
+                             f'(default: {DEFAULT_LAYER_CACHE_BYTES // (1024 * 1024)})')
+    parser.add_argument('--max-megapixels', type=float, default=DEFAULT_MAX_PIXELS / 1e6,
+                        help=f'Reject input images larger than this (default: {DEFAULT_MAX_PIXELS / 1e6:.0f})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print which outputs are out of date and would be rebuilt, without building')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild every output even if it is up to date')
+    parser.add_argument('--batch', default=None, metavar='MANIFEST',
+                        help='Generate every pet listed in a JSONL manifest, one JSON object of options per line')
+    parser.add_argument('--batch-jobs', type=int, default=1,
+                        help='Pets generated in parallel with --batch, each in its own process (default: 1)')
+    parser.add_argument('--batch-report', default=None,
+                        help='Where --batch writes its JSON report (default: <manifest>.report.json)')
+    parser.add_argument('--asset-links', choices=LINK_MODES, default='auto',
+                        help='How sheets reach extension/ and desktop-app/: auto tries reflink, then hardlink, '
+                             'then copy (default: auto)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Reuse sprite sheets rendered by earlier builds from this cache directory')
+    parser.add_argument('--cache-max-mb', type=float, default=512,
+                        help='Size limit for --cache-dir before LRU eviction (default: 512)')
+    return parser
+
+def build_pet(args: argparse.Namespace, progress: Optional[Callable[[str, str], None]] = None) -> Dict:
+    """
+    Generate one pet from parsed command line options
+    Raises ValueError for invalid options (ImageTooLargeError for oversized
+    images). Returns a summary: name, output_dir, animation count and the
+    build steps that were rebuilt or up to date. progress(step, state) is
+    called as build steps start and finish.
+    """
     # Create output directory
     output_dir = Path(args.output)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if not args.dry_run:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    graph = BuildGraph(output_dir, dry_run=args.dry_run, force=args.force, progress=progress, jobs=MODE_WORKERS)
 
-    print(f"\n🎨 Desktop Pet Generator v2.0")
+    print(f"\n🎨 Desktop Pet Generator v{GENERATOR_VERSION}")
     print(f"{'='*50}")
     print(f"Image: {args.image}")
     print(f"Name: {args.name}")
     print(f"Output: {output_dir}")
 
+    if args.max_megapixels <= 0:
+        raise ValueError(f"--max-megapixels must be positive: {args.max_megapixels}")
+    max_pixels = int(args.max_megapixels * 1_000_000)
+    if args.layer_cache_mb < 0:
+        raise ValueError(f"--layer-cache-mb cannot be negative: {args.layer_cache_mb}")
+
     # Configuration
     config = {
         'name': args.name,
@@ -727,28 +1519,72 @@ Available animations:
         print(f"  → {', '.join(animations)}")
         print(f"{'='*50}\n")
 
+        densities = tuple(sorted({int(d) for d in args.densities.split(',')} | {1}))
+        if min(densities) < 1:
+            raise ValueError(f"--densities must be positive integers: {args.densities}")
+        if args.tween < 1:
+            raise ValueError(f"--tween must be a positive integer: {args.tween}")
+        animated = tuple(fmt.strip() for fmt in args.animated.split(',') if fmt.strip())
+        unknown = [fmt for fmt in animated if fmt not in ANIMATED_FORMATS]
+        if unknown:
+            raise ValueError(f"--animated accepts {', '.join(ANIMATED_FORMATS)}, not: {', '.join(unknown)}")
+
+        options = SpriteOptions(layout=args.layout, atlas_max_size=args.atlas_max_size,
+                                max_sheet_size=args.max_sheet_size,
+                                trim=args.trim, dedupe=args.dedupe, encoding=args.encoding,
+                                byte_budget=int(args.byte_budget_kb * 1024) if args.byte_budget_kb else None,
+                                densities=densities, stream=args.stream, tween=args.tween,
+                                animated=animated)
+        if options.stream_conflicts():
+            raise ValueError(f"--stream cannot be combined with: {', '.join(options.stream_conflicts())}")
+
+        cache = None
+        if args.cache_dir:
+            cache = SpriteCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
         # Generate multi-animation sprites
-        animations_metadata = create_multi_animation_sprites(
-            args.image,
-            output_dir,
-            animations,
-            config['size']
-        )
+        def build_sprites():
+            animations_metadata = create_multi_animation_sprites(
+                args.image,
+                output_dir,
+                animations,
+                config['size'],
+                jobs=args.jobs,
+                executor=args.executor,
+                cache=cache,
+                options=options,
+                max_pixels=max_pixels,
+                layer_cache_bytes=int(args.layer_cache_mb * 1024 * 1024)
+            )
+            return [output_dir / name for name in _sprite_output_files(animations_metadata)], animations_metadata
+
+        # The same inputs that key the sprite cache, so a changed animation
+        # config or transform rebuilds the sheets too
+        animations_metadata = graph.run('sprites', lambda: {
+            **_sprite_cache_fields(graph.file_digest(args.image), animations, config['size'], options),
+            'order': animations
+        }, build_sprites)
 
         # Save animations.json
-        animations_config = {
-            'pet_name': config['name'],
-            'version': '2.0',
+        def build_animations_json():
+            animations_config = {
+                'pet_name': config['name'],
+                'version': '2.0',
+                'animations': animations_metadata,
+                'default_animation': animations[0] if animations else 'idle'
+            }
+
+            with open(output_dir / "animations.json", 'w', encoding='utf-8') as f:
+                json.dump(animations_config, f, indent=2, ensure_ascii=False)
+
+            print(f"\n✅ animations.json created with {len(animations_metadata)} animations")
+            return [output_dir / "animations.json"], animations_config
+
+        sprite_info = graph.run('animations.json', lambda: {
+            'name': config['name'],
             'animations': animations_metadata,
             'default_animation': animations[0] if animations else 'idle'
-        }
-
-        with open(output_dir / "animations.json", 'w', encoding='utf-8') as f:
-            json.dump(animations_config, f, indent=2, ensure_ascii=False)
-
-        print(f"\n✅ animations.json created with {len(animations_metadata)} animations")
-
-        sprite_info = animations_config
+        }, build_animations_json, deps=('sprites',))
 
     else:
         # Legacy single sprite mode
@@ -759,35 +1595,91 @@ Available animations:
         config['frames'] = args.frames
 
         sprite_path = output_dir / "sprite.png"
-        width, height = create_sprite_sheet(
-            args.image,
-            sprite_path,
-            frames=args.frames,
-            size=config['size']
-        )
-
-        sprite_info = {
-            'width': width,
-            'height': height,
-            'frames': args.frames,
-            'frame_width': args.size
-        }
 
-    # Generate versions based on modes
+        def build_sprite():
+            width, height = create_sprite_sheet(
+                args.image,
+                sprite_path,
+                frames=args.frames,
+                size=config['size'],
+                max_pixels=max_pixels
+            )
+            return [sprite_path], {
+                'width': width,
+                'height': height,
+                'frames': args.frames,
+                'frame_width': args.size
+            }
+
+        sprite_info = graph.run('sprites', lambda: {
+            'image': graph.file_digest(args.image),
+            'frames': args.frames,
+            'size': config['size'],
+            'version': GENERATOR_VERSION,
+            'render_revision': RENDER_REVISION
+        }, build_sprite)
+
+    # Generate versions based on modes, side by side once the sprites are
+    # done; each is redone only when its inputs, templates or the sprites
+    # it ships changed
     modes = [m.strip() for m in args.modes.split(',')]
     auto_package = not args.no_package
+    sprite_deps = ('animations.json', 'sprites') if use_multi_animations else ('sprites',)
+    publisher = AssetPublisher(args.asset_links)
+
+    def mode_inputs(kind):
+        return lambda: {'name': config['name'], 'sprite_info': sprite_info, 'version': GENERATOR_VERSION,
+                        'templates': _template_digests(kind)}
 
     if 'web' in modes:
-        generate_web_version(config, sprite_info, output_dir)
+        graph.submit('web', mode_inputs('web'),
+                     lambda: (generate_web_version(config, sprite_info, output_dir), None), deps=sprite_deps[:1])
 
     if 'extension' in modes:
-        generate_extension_version(config, sprite_info, output_dir)
+        graph.submit('extension', mode_inputs('extension'),
+                     lambda: (generate_extension_version(config, sprite_info, output_dir, publisher), None),
+                     deps=sprite_deps)
 
     if 'desktop' in modes:
-        generate_desktop_version(config, sprite_info, output_dir, auto_package=auto_package)
+        graph.submit('desktop', mode_inputs('desktop'),
+                     lambda: (_write_desktop_app(config, sprite_info, output_dir, publisher), None),
+                     deps=sprite_deps)
+
+        if auto_package:
+            def build_package():
+                desktop_dir = output_dir / "desktop-app"
+                if not package_desktop_app(desktop_dir, config):
+                    say("   📦 Manual build: cd desktop-app && npm install && npm run build")
+                    return None
+                return [path for path in (desktop_dir / "dist").rglob("*") if path.is_file()], None
+
+            # npm runs for minutes; the other modes and the README finish meanwhile
+            graph.submit('package', lambda: {}, build_package, deps=('desktop',))
+        elif not args.dry_run:
+            say("   📦 Build: cd desktop-app && npm install && npm run build")
 
     # Generate README
-    generate_readme(config, output_dir, has_multi_animations=use_multi_animations)
+    graph.submit('readme',
+                 lambda: {'name': config['name'], 'multi': use_multi_animations, 'version': GENERATOR_VERSION},
+                 lambda: (generate_readme(config, output_dir, has_multi_animations=use_multi_animations), None))
+    graph.wait()
+
+    print(f"\n{graph.summary()}")
+    if any(publisher.counts.values()):
+        print(publisher.summary())
+    summary = {
+        'name': config['name'],
+        'output_dir': str(output_dir),
+        'animations': len(animations_metadata) if use_multi_animations and animations_metadata else None,
+        'rebuilt': list(graph.stale),
+        'up_to_date': graph.fresh,
+        'timings': graph.timings,
+        'assets': publisher.get_stats(),
+        'artifacts': [str(path) for path in graph.artifacts()],
+        'metadata': sprite_info
+    }
+    if args.dry_run:
+        return summary
 
     print(f"\n{'='*50}")
     print(f"✨ Generation complete!")
@@ -797,10 +1689,253 @@ Available animations:
         print(f"🎬 Generated {len(animations_metadata)} animations")
         print(f"📋 Check animations.json for animation metadata")
     print(f"\n🎉 Your {config['name']} pet is ready to use!")
+    return summary
+
+# Option values given as lists are joined into the comma-separated form
+# the command line uses
+_LIST_FIELDS = ('animations', 'modes', 'densities', 'animated')
+
+# Options that apply to the batch as a whole, not to single pets
+_BATCH_ONLY_FIELDS = ('batch', 'batch_jobs', 'batch_report')
+
+def pet_options(defaults: Optional[argparse.Namespace] = None, **fields) -> argparse.Namespace:
+    """
+    Options for one pet, as build_pet takes them
+    fields are command line option names (with dashes or underscores) and
+    override defaults, the command line defaults unless given. Lists are
+    accepted for comma-separated options. Unknown names raise ValueError.
+    """
+    defaults = defaults or _build_parser().parse_args([])
+    fields = {key.replace('-', '_'): value for key, value in fields.items()}
+    unknown = sorted(key for key in fields if key in _BATCH_ONLY_FIELDS or not hasattr(defaults, key))
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    for key in _LIST_FIELDS:
+        if isinstance(fields.get(key), list):
+            fields[key] = ','.join(str(value) for value in fields[key])
+    return argparse.Namespace(**{**vars(defaults), **fields})
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    sys.stdout replacement that sends prints made under capture_output() to
+    that call's log and everything else to the real stdout
+    The log is a context variable, so threads a build starts with its
+    context (e.g. the concurrent output-mode steps) log there too.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.log: contextvars.ContextVar = contextvars.ContextVar('pet_log', default=None)
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, 'encoding', 'utf-8')
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def write(self, text):
+        target = self.log.get()
+        return (target or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+_install_lock = threading.Lock()
+
+@contextlib.contextmanager
+def capture_output(log: io.StringIO):
+    """
+    Send this thread's prints to log for the duration, leaving other threads' output alone
+    Unlike contextlib.redirect_stdout this is safe with several builds in
+    one process: sys.stdout is replaced once by a _ThreadOutput that stays
+    in place, and each call only sets its context's log.
+    """
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+        output = sys.stdout
+    token = output.log.set(log)
+    try:
+        yield log
+    finally:
+        output.log.reset(token)
+
+@dataclass
+class PetResult:
+    """A pet generated by generate(): where it is, what it contains and what it took"""
+    name: str
+    output_dir: Path
+    artifacts: List[Path]  # every file the build wrote or found up to date
+    metadata: Optional[Dict]  # animations.json contents, or the legacy sprite info
+    seconds: float
+    timings: Dict[str, float]  # seconds per build step that ran
+    rebuilt: List[str]
+    up_to_date: List[str]
+    log: str = ''  # console output when generated quietly
+
+def generate(image, output='./output', quiet: bool = False, **options) -> PetResult:
+    """
+    Generate a pet in this process, without starting pet_generator.py
+    options are command line options as keyword arguments, e.g.
+    generate('cat.png', name='Cat', animations='core', size=128).
+    Raises ValueError for invalid options and ImageTooLargeError for
+    oversized images. With quiet, progress output is kept in the result's
+    log instead of printed.
+    """
+    args = pet_options(image=str(image), output=str(output), **options)
+    log = io.StringIO()
+    start = time.perf_counter()
+    with capture_output(log) if quiet else contextlib.nullcontext():
+        summary = build_pet(args)
+    return PetResult(
+        name=summary['name'],
+        output_dir=Path(summary['output_dir']),
+        artifacts=[Path(path) for path in summary['artifacts']],
+        metadata=summary['metadata'],
+        seconds=round(time.perf_counter() - start, 3),
+        timings=summary['timings'],
+        rebuilt=summary['rebuilt'],
+        up_to_date=summary['up_to_date'],
+        log=log.getvalue()
+    )
+
+def _batch_pet_args(defaults: argparse.Namespace, entry: Dict, manifest_dir: Path) -> argparse.Namespace:
+    """
+    Options for one manifest line: the batch's own options overridden by
+    the line's fields, with paths relative to the manifest
+    A pet without an output directory gets <--output>/<name>.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError("manifest line is not a JSON object")
+    fields = {key.replace('-', '_'): value for key, value in entry.items()}
+    if not fields.get('image'):
+        raise ValueError("missing 'image'")
+
+    pet = pet_options(defaults, **fields)
+    pet.image = str(manifest_dir / pet.image)
+    if 'output' in fields:
+        pet.output = str(manifest_dir / pet.output)
+    else:
+        stem = pet.name if 'name' in fields else Path(pet.image).stem
+        pet.output = str(Path(defaults.output) / stem.lower().replace(' ', '-'))
+    return pet
+
+def _run_batch_pet(index: int, pet: Optional[argparse.Namespace], error: Optional[str] = None) -> Dict:
+    """
+    Build one batch entry with its console output captured
+    Any failure is reported in the result instead of raised, so one
+    broken pet never stops the others.
+    """
+    result = {'index': index, 'name': getattr(pet, 'name', None), 'image': getattr(pet, 'image', None),
+              'output_dir': getattr(pet, 'output', None), 'status': 'failed', 'seconds': 0.0}
+    if error is not None:
+        result['error'] = error
+        return result
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with capture_output(log):
+            summary = build_pet(pet)
+        # The report keeps per-pet facts; artifacts and metadata stay in the outputs
+        result.update({key: value for key, value in summary.items() if key not in ('artifacts', 'metadata')})
+        result['status'] = 'ok'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['log'] = log.getvalue()
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+def run_batch(args: argparse.Namespace) -> Dict:
+    """
+    Generate every pet in a JSONL manifest in this process, or in a pool
+    of --batch-jobs worker processes
+    Interpreter start-up, imports and templates are paid once per worker
+    instead of once per pet. Writes a JSON report with per-pet status and
+    timings and returns it.
+    """
+    if args.batch_jobs < 1:
+        raise ValueError(f"--batch-jobs must be a positive integer: {args.batch_jobs}")
+    manifest_path = Path(args.batch)
+    manifest_dir = manifest_path.parent
+    report_path = Path(args.batch_report) if args.batch_report else manifest_path.with_suffix('.report.json')
+
+    # Bad lines become failed entries; the rest of the batch still runs
+    entries = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entries.append((line_number, _batch_pet_args(args, json.loads(line), manifest_dir), None))
+            except ValueError as e:
+                entries.append((line_number, None, str(e)))
+
+    print(f"\n📚 Batch: {len(entries)} pets from {manifest_path} ({args.batch_jobs} at a time)")
+    start = time.perf_counter()
+    results = []
+
+    def report_progress(result):
+        results.append(result)
+        label = result['name'] or f"line {result['index']}"
+        if result['status'] == 'ok':
+            print(f"✅ [{len(results)}/{len(entries)}] {label}: {result['seconds']:.2f}s → {result['output_dir']}")
+        else:
+            print(f"❌ [{len(results)}/{len(entries)}] {label}: {result['error']}")
+
+    if args.batch_jobs > 1:
+        with concurrent_futures.ProcessPoolExecutor(max_workers=args.batch_jobs) as pool:
+            futures = [pool.submit(_run_batch_pet, *entry) for entry in entries]
+            for future in concurrent_futures.as_completed(futures):
+                report_progress(future.result())
+    else:
+        for entry in entries:
+            report_progress(_run_batch_pet(*entry))
+
+    results.sort(key=lambda result: result['index'])
+    failed = [result for result in results if result['status'] != 'ok']
+    report = {
+        'manifest': str(manifest_path),
+        'jobs': args.batch_jobs,
+        'seconds': round(time.perf_counter() - start, 3),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'pets': results
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    pet_seconds = sum(result['seconds'] for result in results)
+    print(f"\n📊 Batch: {report['succeeded']} succeeded, {report['failed']} failed in {report['seconds']:.2f}s "
+          f"({pet_seconds:.2f}s of pet builds)")
+    print(f"📋 Report: {report_path}")
+    return report
+
+def main():
+    parser = _build_parser()
+    args = parser.parse_args()
+
+    if args.batch:
+        try:
+            report = run_batch(args)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        sys.exit(1 if report['failed'] else 0)
+
+    if not args.image:
+        parser.error("the following arguments are required: --image (or --batch)")
+    try:
+        build_pet(args)
+    except ImageTooLargeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except ValueError as e:
+        parser.error(str(e))
 
 if __name__ == '__main__':
     if len(sys.argv) == 1:
-        print("Desktop Pet Generator v2.0")
+        print(f"Desktop Pet Generator v{GENERATOR_VERSION}")
         print("=" * 60)
         print("\nUsage:")
         print("  python pet_generator.py --image <path> [options]")
@@ -815,6 +1950,28 @@ if __name__ == '__main__':
         print("  --size N            Frame size in pixels (default: 64)")
         print("  --modes MODES       Output modes (default: web,extension,desktop)")
         print("  --no-package        Skip automatic packaging (default: auto-package enabled)")
+        print("  --jobs N            Parallel sprite rendering workers (default: 1)")
+        print("  --executor KIND     Worker backend for --jobs: thread or process (default: thread)")
+        print("  --layout KIND       Sprite layout: strip, grid or atlas (default: strip)")
+        print("  --atlas-max-size N  Max atlas sheet dimension, power of two (default: 2048)")
+        print("  --max-sheet-size N  Max grid sheet dimension (default: 4096)")
+        print("  --trim              Crop transparent frame borders (offsets kept in animations.json)")
+        print("  --dedupe            Store identical frames once (ping-pong/sequence playback)")
+        print("  --encoding KIND     Sheet encoding: png, png-max, palette or webp (default: png)")
+        print("  --byte-budget-kb N  Per-pet sprite budget, met by reducing palette colors")
+        print("  --densities LIST    Pixel densities, e.g. 1,2,3 (higher ones as @2x/@3x sheets)")
+        print("  --animated LIST     Also export animated webp and/or apng per animation")
+        print("  --tween N           Render N frames per configured frame (smoother loops)")
+        print("  --stream            Write strip sheets band by band (memory bounded by one frame)")
+        print("  --layer-cache-mb N  Memory for resampled layers reused across animations (default: 256)")
+        print("  --max-megapixels N  Reject larger input images (default: 100)")
+        print("  --dry-run           Show which outputs would be rebuilt, build nothing")
+        print("  --force             Rebuild all outputs, even unchanged ones")
+        print("  --batch FILE        Generate all pets in a JSONL manifest (one options object per line)")
+        print("  --batch-jobs N      Pets generated in parallel with --batch (default: 1)")
+        print("  --batch-report FILE JSON report with per-pet status and timings")
+        print("  --cache-dir DIR     Reuse sprite sheets from earlier builds (content-addressed)")
+        print("  --cache-max-mb N    Cache size limit before LRU eviction (default: 512)")
         print("  --frames N          [Legacy] Animation frames (default: 8)")
         print("\nAnimation Presets:")
         print("  core       → idle, walk, jump (3 animations)")
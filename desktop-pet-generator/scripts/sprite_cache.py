@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Sprite Cache for Desktop Pet Generator
+Content-addressed on-disk cache of rendered sprite sheets shared across builds
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class SpriteCache:
+    """
+    Persistent sprite sheet cache with size-bounded LRU eviction
+
+    Entries are keyed by a hash of everything that affects the rendered
+    pixels (source image bytes, animation config, frame size, generator
+    version, output options). Each entry holds one or more encoded sheets
+    and their metadata; the metadata file's mtime doubles as the LRU
+    timestamp.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, link: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """SHA-256 of a file's raw bytes (the image is never decoded)"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(fields: Dict) -> str:
+        """Stable cache key for a dict of JSON-serializable inputs"""
+        payload = json.dumps(fields, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_paths(self, key: str):
+        entry_dir = self.objects_dir / key[:2]
+        return entry_dir / key, entry_dir / f"{key}.json"
+
+    def fetch(self, key: str, dest_dir: Path) -> Optional[Dict]:
+        """
+        Publish a cached entry's files into dest_dir and return its metadata
+        Returns None (and counts a miss) when the entry is absent
+        """
+        files_dir, meta_path = self._entry_paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            for name in entry['files']:
+                self._publish(files_dir / name, Path(dest_dir) / name)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        os.utime(meta_path)
+        self.hits += 1
+        return entry['metadata']
+
+    def _publish(self, cached_file: Path, dest: Path):
+        """Hardlink a cached file to dest, falling back to a copy"""
+        # Never write through an existing file: it may itself be a link
+        # into the cache
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+
+        if self.link:
+            try:
+                os.link(cached_file, dest)
+                return
+            except OSError:
+                pass
+
+        shutil.copyfile(cached_file, dest)
+
+    def store(self, key: str, files: List[Path], metadata: Dict):
+        """Add freshly rendered sheets and their metadata to the cache"""
+        files_dir, meta_path = self._entry_paths(key)
+        files_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write to temp files and rename so concurrent builds never see
+        # a partial file; sheets are made read-only because outputs may
+        # hardlink to them. The metadata goes last and marks the entry
+        # complete.
+        for file in files:
+            fd, tmp_file = tempfile.mkstemp(dir=files_dir, suffix='.tmp')
+            os.close(fd)
+            shutil.copyfile(file, tmp_file)
+            os.chmod(tmp_file, 0o444)
+            os.replace(tmp_file, files_dir / Path(file).name)
+
+        fd, tmp_meta = tempfile.mkstemp(dir=meta_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'files': [Path(file).name for file in files], 'metadata': metadata},
+                      f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+
+        self.stores += 1
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for meta_path in self.objects_dir.glob("*/*.json"):
+            files_dir = meta_path.with_suffix('')
+            try:
+                used = meta_path.stat().st_mtime
+                size = meta_path.stat().st_size
+                size += sum(f.stat().st_size for f in files_dir.glob("*"))
+            except OSError:
+                continue
+            entries.append((used, size, meta_path, files_dir))
+            total += size
+
+        removed = 0
+        for used, size, meta_path, files_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                meta_path.unlink()
+            except OSError:
+                pass
+            shutil.rmtree(files_dir, ignore_errors=True)
+            total -= size
+            removed += 1
+
+        self.evictions += removed
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for this cache instance"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def main():
+    """CLI entry point: show or trim a cache directory"""
+    if len(sys.argv) < 2:
+        print("Usage: python sprite_cache.py <cache_dir> [max_mb]")
+        sys.exit(1)
+
+    max_bytes = int(float(sys.argv[2]) * 1024 * 1024) if len(sys.argv) > 2 else 512 * 1024 * 1024
+    cache = SpriteCache(sys.argv[1], max_bytes=max_bytes)
+    removed = cache.evict()
+
+    entries = list(cache.objects_dir.glob("*/*.json"))
+    total = sum(p.stat().st_size for p in cache.objects_dir.rglob("*") if p.is_file())
+    print(json.dumps({
+        "cache_dir": str(cache.cache_dir),
+        "entries": len(entries),
+        "bytes": total,
+        "evicted": removed
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Sprite Encoder for Desktop Pet Generator
+Encodes rendered sprite sheets as PNG, shared-palette PNG or lossless WebP,
+and animations as animated WebP or APNG
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+PngImagePlugin = lazy_import('PIL.PngImagePlugin')
+features = lazy_import('PIL.features')
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+ENCODINGS = ('png', 'png-max', 'palette', 'webp')
+
+ANIMATED_FORMATS = ('webp', 'apng')
+
+# Smallest palette tried when shrinking sheets to fit a byte budget
+MIN_BUDGET_COLORS = 16
+
+
+def resolve_encoding(encoding: str) -> str:
+    """Validate an encoding name, falling back to PNG when WebP is unavailable"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown sprite encoding: {encoding}")
+    if encoding == 'webp' and not features.check('webp'):
+        print("⚠️  Pillow was built without WebP support, using max-compression PNG")
+        return 'png-max'
+    return encoding
+
+
+def file_extension(encoding: str) -> str:
+    """File extension for sheets written with the given encoding"""
+    return '.webp' if encoding == 'webp' else '.png'
+
+
+def resolve_animated_formats(formats) -> Tuple[str, ...]:
+    """Validate animated export formats, dropping WebP when it is unavailable"""
+    for fmt in formats:
+        if fmt not in ANIMATED_FORMATS:
+            raise ValueError(f"Unknown animated format: {fmt}")
+    if 'webp' in formats and not features.check('webp'):
+        print("⚠️  Pillow was built without WebP support, skipping animated WebP")
+        formats = [fmt for fmt in formats if fmt != 'webp']
+    return tuple(formats)
+
+
+def animated_extension(fmt: str) -> str:
+    """File extension for an animated export format"""
+    return '.webp' if fmt == 'webp' else '.png'
+
+
+def _packed_pixels(image_array: np.ndarray) -> np.ndarray:
+    """RGBA pixels as uint32, with every fully transparent pixel mapped to 0"""
+    packed = np.ascontiguousarray(image_array).reshape(-1, 4).view('<u4').ravel()
+    # Alpha is the high byte
+    return np.where(packed < (1 << 24), 0, packed).astype('<u4')
+
+
+def build_palette(image_arrays: List[np.ndarray], colors: int = 256) -> np.ndarray:
+    """
+    One (N, 4) RGBA palette shared by all given images
+    Entry 0 is fully transparent. Images with few enough distinct colors
+    get an exact palette; otherwise visible pixels are octree-quantized.
+    """
+    packed = np.concatenate([_packed_pixels(a) for a in image_arrays])
+    visible = np.unique(packed[packed != 0])
+
+    if len(visible) < colors:
+        entries = visible
+    else:
+        # Quantizing a sample keeps this fast on large atlases
+        step = max(1, len(packed) // 1_000_000)
+        sample = packed[::step]
+        sample = sample[sample != 0].view(np.uint8).reshape(-1, 1, 4)
+        quantized = Image.fromarray(sample).quantize(colors - 1, method=Image.Quantize.FASTOCTREE)
+        entries = np.array(quantized.getpalette('RGBA'), dtype=np.uint8).view('<u4')
+        entries = entries[np.unique(np.asarray(quantized))]
+
+    return np.concatenate([np.zeros(1, dtype='<u4'), entries.astype('<u4')]).view(np.uint8).reshape(-1, 4)
+
+
+def quantize_to_palette(image_array: np.ndarray, palette: np.ndarray) -> Image.Image:
+    """Map every pixel to its nearest RGBA palette entry and return a P-mode image"""
+    unique, inverse = np.unique(_packed_pixels(image_array), return_inverse=True)
+    pixel_colors = unique.view(np.uint8).reshape(-1, 4).astype(np.float32)
+    palette_colors = palette.astype(np.float32)
+
+    # |c - p|^2 = |c|^2 - 2 c.p + |p|^2, in chunks to bound memory
+    nearest = np.empty(len(unique), dtype=np.uint8)
+    palette_norms = (palette_colors ** 2).sum(axis=1)
+    for start in range(0, len(unique), 16384):
+        chunk = pixel_colors[start:start + 16384]
+        distances = palette_norms[None, :] - 2 * chunk @ palette_colors.T
+        nearest[start:start + 16384] = distances.argmin(axis=1)
+
+    height, width = image_array.shape[:2]
+    image = Image.fromarray(nearest[inverse.ravel()].reshape(height, width))
+    image.putpalette(palette.tobytes(), 'RGBA')
+    return image
+
+
+def _register_webp():
+    """Load only Pillow's WebP plugin; saving a format no plugin has registered yet imports all of them"""
+    from PIL import WebPImagePlugin  # noqa: F401
+
+
+def encode_image(image_array: np.ndarray, path: Path, encoding: str = 'png',
+                 palette: Optional[np.ndarray] = None) -> int:
+    """
+    Write an (H, W, 4) array to path and return the encoded size in bytes
+    With a palette, pixels are first mapped onto it (palette PNG, or WebP
+    lossless which stores it as a color-indexed image).
+    """
+    image = Image.fromarray(image_array) if palette is None else quantize_to_palette(image_array, palette)
+    # A previous build may have hardlinked this path to a cache entry
+    if path.exists() or path.is_symlink():
+        path.unlink()
+
+    if encoding == 'webp':
+        _register_webp()
+        image.save(path, 'WEBP', lossless=True, quality=100, method=6)
+    elif encoding == 'png':
+        image.save(path, 'PNG')
+    else:
+        image.save(path, 'PNG', optimize=True)
+    return path.stat().st_size
+
+
+def encode_animation(frames: np.ndarray, durations: List[int], path: Path, fmt: str) -> int:
+    """
+    Write straight-alpha (frames, H, W, 4) pixels as a looping animation
+    and return its size in bytes
+    Frames after the first only store what changed: APNG frames replace
+    the bounding box of their difference to the previous frame, identical
+    frames are merged, and libwebp picks the cheapest disposal per frame.
+    """
+    images = [Image.fromarray(frame) for frame in frames]
+    # A previous build may have hardlinked this path to a cache entry
+    if path.exists() or path.is_symlink():
+        path.unlink()
+
+    if fmt == 'webp':
+        _register_webp()
+        images[0].save(path, 'WEBP', save_all=True, append_images=images[1:], duration=durations, loop=0,
+                       lossless=True, quality=100, method=6, minimize_size=True)
+    else:
+        images[0].save(path, 'PNG', save_all=True, append_images=images[1:], duration=durations, loop=0,
+                       disposal=PngImagePlugin.Disposal.OP_NONE, blend=PngImagePlugin.Blend.OP_SOURCE)
+    return path.stat().st_size
+
+
+def png_size(image_array: np.ndarray) -> int:
+    """Size of an array as a default-settings PNG, for before/after reports"""
+    buffer = io.BytesIO()
+    Image.fromarray(image_array).save(buffer, 'PNG')
+    return buffer.tell()
+
+
+class PNGStreamWriter:
+    """
+    Write an RGBA PNG band by band without holding the whole image
+    Rows are filtered per scanline (the best of None/Sub/Up/Paeth, chosen
+    like libpng's heuristic) and fed straight into one zlib stream.
+    """
+
+    def __init__(self, path: Path, width: int, height: int, compress_level: int = 6):
+        self.path = Path(path)
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._previous = np.zeros((1, width * 4), dtype=np.uint8)
+        self._compressor = zlib.compressobj(compress_level)
+
+        # A previous build may have hardlinked this path to a cache entry
+        if self.path.exists() or self.path.is_symlink():
+            self.path.unlink()
+        self._file = open(self.path, 'wb')
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8-bit RGBA, deflate, adaptive filtering, no interlace
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack('>I', len(data)) + kind + data)
+        self._file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def write_rows(self, rows: np.ndarray):
+        """Append an (n, width, 4) uint8 band of straight-alpha rows"""
+        # Filtering needs ~20 bytes of scratch per pixel, so go a few rows at a time
+        step = max(1, (1 << 18) // (self.width * 4))
+        for start in range(0, len(rows), step):
+            self._write_filtered(rows[start:start + step])
+        self.rows_written += len(rows)
+
+    def _write_filtered(self, rows: np.ndarray):
+        raw = rows.reshape(len(rows), self.width * 4)
+        up = np.concatenate([self._previous, raw[:-1]])
+        self._previous = raw[-1:].copy()
+
+        raw16, up16 = raw.astype(np.int16), up.astype(np.int16)
+        left = np.zeros_like(raw16)
+        left[:, 4:] = raw16[:, :-4]
+        up_left = np.zeros_like(raw16)
+        up_left[:, 4:] = up16[:, :-4]
+
+        estimate = left + up16 - up_left
+        distance_left = np.abs(estimate - left)
+        distance_up = np.abs(estimate - up16)
+        distance_up_left = np.abs(estimate - up_left)
+        paeth = np.where((distance_left <= distance_up) & (distance_left <= distance_up_left), left,
+                         np.where(distance_up <= distance_up_left, up16, up_left))
+
+        candidates = np.stack([raw16, raw16 - left, raw16 - up16, raw16 - paeth]).astype(np.uint8)
+        # Smallest sum of residuals read as signed bytes compresses best
+        cost = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+        choice = cost.argmin(axis=0)
+
+        filtered = np.empty((len(rows), self.width * 4 + 1), dtype=np.uint8)
+        # PNG filter types: 0 None, 1 Sub, 2 Up, 4 Paeth (3 Average is not tried)
+        filtered[:, 0] = np.array([0, 1, 2, 4], dtype=np.uint8)[choice]
+        filtered[:, 1:] = candidates[choice, np.arange(len(rows))]
+
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+
+    def close(self) -> int:
+        """Finish the file and return its size in bytes"""
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError(f"{self.path}: wrote {self.rows_written} of {self.height} rows")
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+        self._file.close()
+        return self.path.stat().st_size
+
+
+def _run(executor: Optional[Executor], func, arg_lists: List[Tuple]) -> List:
+    """Call func on each argument tuple, on the executor when there is one"""
+    if executor is None:
+        return [func(*args) for args in arg_lists]
+    return [future.result() for future in [executor.submit(func, *args) for args in arg_lists]]
+
+
+def encode_sheets(sheets: List[Tuple[Path, np.ndarray]], encoding: str = 'png',
+                  byte_budget: Optional[int] = None, executor: Optional[Executor] = None) -> Dict:
+    """
+    Encode all sheets of one pet and return a size report
+    Palette encoding shares one palette across every sheet. When the total
+    exceeds byte_budget, sheets are re-encoded on a shared palette with
+    half as many colors each time, down to MIN_BUDGET_COLORS.
+    """
+    arrays = [array for _, array in sheets]
+    baseline = None
+    if encoding != 'png':
+        baseline = sum(_run(executor, png_size, [(array,) for array in arrays]))
+
+    colors = 256 if encoding == 'palette' else None
+    while True:
+        palette = build_palette(arrays, colors) if colors else None
+        total = sum(_run(executor, encode_image,
+                         [(array, path, encoding, palette) for path, array in sheets]))
+        if baseline is None:
+            baseline = total
+
+        if byte_budget is None or total <= byte_budget:
+            break
+        if colors == MIN_BUDGET_COLORS:
+            print(f"⚠️  Sprites are {total} bytes, over the {byte_budget} byte budget "
+                  f"even at {colors} colors")
+            break
+        colors = colors // 2 if colors else 256
+
+    return {
+        'encoding': encoding,
+        'sheets': len(sheets),
+        'baseline_bytes': baseline,
+        'bytes': total,
+        'colors': len(palette) if palette is not None else None
+    }
+
+
+def main():
+    """CLI entry point: re-encode PNG sheets and print the size report"""
+    if len(sys.argv) < 4:
+        print(f"Usage: python sprite_encoder.py <{'|'.join(ENCODINGS)}> <output_dir> <sheet.png>...")
+        sys.exit(1)
+
+    encoding = resolve_encoding(sys.argv[1])
+    output_dir = Path(sys.argv[2])
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    sheets = []
+    for name in sys.argv[3:]:
+        with Image.open(name) as image:
+            array = np.asarray(image.convert('RGBA'))
+        sheets.append((output_dir / (Path(name).stem + file_extension(encoding)), array))
+
+    print(json.dumps(encode_sheets(sheets, encoding), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for Desktop Pet Generator
+Times the CLIs on runs that render nothing and breaks their imports down with -X importtime
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from lazy_import import HEAVY_MODULES
+
+SCRIPTS_DIR = Path(__file__).parent
+
+# Wall-clock budget per CLI run, interpreter start included
+DEFAULT_BUDGET_MS = 100.0
+
+# Runs that must not pay for numpy or Pillow
+COMMANDS = {
+    'pet_generator --help': ['pet_generator.py', '--help'],
+    'python -m pet_generator --help': ['-m', 'pet_generator', '--help'],
+    'image_analyzer (usage)': ['image_analyzer.py'],
+    'animation_generator --help': ['animation_generator.py', '--help'],
+    'animation_generator --list': ['animation_generator.py', '--list'],
+}
+
+# Modules whose imports are broken down
+MODULES = ('pet_generator', 'image_analyzer', 'animation_generator')
+
+
+def _env() -> Dict[str, str]:
+    # Installs keep bytecode caches; without them every run recompiles
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def time_command(argv: List[str], runs: int) -> Dict:
+    """Best and median wall time of a CLI run, after one warm-up run that writes bytecode caches"""
+    command = [sys.executable, *argv]
+    env = _env()
+    subprocess.run(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'best_ms': round(min(times), 1), 'median_ms': round(statistics.median(times), 1)}
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every import made by `import module`, as -X importtime reports them"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=SCRIPTS_DIR, env=_env(), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_report(module: str, top: int) -> Dict:
+    """Total import time of a module, its slowest imports and the heavy modules it pulls in"""
+    rows = import_times(module)
+    total = next((cumulative for name, _, cumulative in rows if name == module), 0)
+    names = {name for name, _, _ in rows}
+    slowest = sorted((row for row in rows if row[0] != module), key=lambda row: row[1], reverse=True)[:top]
+    return {
+        'total_ms': round(total / 1000, 1),
+        'slowest': [{'module': name, 'self_ms': round(self_us / 1000, 1)} for name, self_us, _ in slowest],
+        'heavy': [heavy for heavy in HEAVY_MODULES if heavy in names]
+    }
+
+
+def main():
+    """CLI entry point: check CLI startup against the budget, exit 1 when over it"""
+    parser = argparse.ArgumentParser(description='Measure Desktop Pet Generator CLI startup time')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'Allowed wall time per CLI run (default: {DEFAULT_BUDGET_MS:.0f})')
+    parser.add_argument('--runs', type=int, default=10, help='Timed runs per CLI (default: 10)')
+    parser.add_argument('--top', type=int, default=5, help='Slowest imports listed per module (default: 5)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    baseline = time_command(['-c', 'pass'], args.runs)
+    commands = {label: time_command(argv, args.runs) for label, argv in COMMANDS.items()}
+    imports = {module: import_report(module, args.top) for module in MODULES}
+    over = [label for label, timing in commands.items() if timing['best_ms'] > args.budget_ms]
+    heavy = [module for module, report in imports.items() if report['heavy']]
+
+    if args.json:
+        print(json.dumps({'budget_ms': args.budget_ms, 'interpreter': baseline, 'commands': commands,
+                          'imports': imports, 'over_budget': over}, indent=2))
+    else:
+        print(f"⏱️  Startup budget {args.budget_ms:.0f} ms (bare interpreter: {baseline['best_ms']:.1f} ms)")
+        for label, timing in commands.items():
+            mark = '❌' if label in over else '✅'
+            print(f"{mark} {label}: {timing['best_ms']:.1f} ms best, {timing['median_ms']:.1f} ms median")
+        for module, report in imports.items():
+            slowest = ', '.join(f"{row['module']} {row['self_ms']:.1f}" for row in report['slowest'])
+            print(f"📦 import {module}: {report['total_ms']:.1f} ms (slowest: {slowest})")
+            if report['heavy']:
+                print(f"   ⚠️  imports {', '.join(report['heavy'])} at startup")
+
+    sys.exit(1 if over or heavy else 0)
+
+
+if __name__ == "__main__":
+    main()
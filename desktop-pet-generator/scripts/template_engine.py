@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Template Engine for Desktop Pet Generator
+Parses {{PLACEHOLDER}} templates once into segments and renders them in a single pass
+"""
+
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PLACEHOLDER = re.compile(r'\{\{([A-Z][A-Z0-9_]*)\}\}')
+
+
+class TemplateError(ValueError):
+    """A template uses placeholders that were given no value"""
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    A template split into literal text and placeholder names
+    literals has one more entry than names: the text before, between and
+    after the placeholders. Rendering joins them with the values, so a
+    value that itself looks like {{NAME}} is never substituted again.
+    """
+    literals: Tuple[str, ...]
+    names: Tuple[str, ...]
+    source: str = '<template>'
+
+    @property
+    def placeholders(self) -> frozenset:
+        return frozenset(self.names)
+
+    def missing(self, values: Dict[str, str]) -> List[str]:
+        """Placeholders of this template that values has no entry for, sorted"""
+        return sorted(name for name in self.placeholders if name not in values)
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Fill in every placeholder in one pass
+        values may hold more entries than the template uses, so one set of
+        values can be shared by all templates of a build.
+        """
+        missing = self.missing(values)
+        if missing:
+            names = ', '.join('{{%s}}' % name for name in missing)
+            raise TemplateError(f"{self.source}: no value for {names}")
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+def compile_template(text: str, source: str = '<template>') -> CompiledTemplate:
+    """Split template text at its placeholders"""
+    pieces = PLACEHOLDER.split(text)
+    return CompiledTemplate(literals=tuple(pieces[0::2]), names=tuple(pieces[1::2]), source=source)
+
+
+# Template files by path, raw and compiled, with the (mtime_ns, size) they
+# were read at
+_CACHE: Dict[Path, Tuple[Tuple[int, int], bytes, Optional[CompiledTemplate]]] = {}
+
+
+def _cached(path: Path) -> Tuple[Tuple[int, int], bytes, Optional[CompiledTemplate]]:
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _CACHE.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, path.read_bytes(), None)
+        _CACHE[path] = cached
+    return cached
+
+
+def template_bytes(path: Path) -> bytes:
+    """
+    Contents of a template file, read once per process
+    Batch builds and long-running callers share one copy; a template that
+    changed on disk is read again.
+    """
+    return _cached(Path(path))[1]
+
+
+def load_template(path: Path) -> CompiledTemplate:
+    """Compiled form of a template file, parsed once per process like template_bytes"""
+    path = Path(path)
+    stamp, data, compiled = _cached(path)
+    if compiled is None:
+        compiled = compile_template(data.decode('utf-8'), source=path.name)
+        _CACHE[path] = (stamp, data, compiled)
+    return compiled
+
+
+def check_templates(templates_dir: Path, known: Iterable[str]) -> Dict[str, Dict]:
+    """Placeholders used by each template file under templates_dir, and those not among the known names"""
+    known = set(known)
+    report = {}
+    for path in sorted(path for path in Path(templates_dir).rglob('*') if path.is_file()):
+        try:
+            placeholders = load_template(path).placeholders
+        except UnicodeDecodeError:
+            continue  # not a text template
+        if placeholders:
+            report[path.relative_to(templates_dir).as_posix()] = {
+                "placeholders": sorted(placeholders),
+                "unknown": sorted(placeholders - known)
+            }
+    return report
+
+
+def main():
+    """CLI entry point: list the placeholders of every template and flag ones the generator does not fill"""
+    from pet_generator import TEMPLATE_PLACEHOLDERS, TEMPLATES_DIR
+
+    templates_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else TEMPLATES_DIR
+    report = check_templates(templates_dir, TEMPLATE_PLACEHOLDERS)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if any(entry["unknown"] for entry in report.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Transform Registry for Desktop Pet Generator
+Declarative keyframed motion for sprite animations, evaluated for all frames at once
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+# Parameter columns returned by evaluate_transform, in order
+CHANNELS = ('scale_x', 'scale_y', 'rotation', 'dx', 'dy', 'alpha')
+CHANNEL_DEFAULTS = {'scale_x': 1.0, 'scale_y': 1.0, 'rotation': 0.0, 'dx': 0.0, 'dy': 0.0, 'alpha': 1.0}
+
+# Offsets are whole pixels, truncated toward zero
+INTEGER_CHANNELS = ('dx', 'dy')
+
+# Easing curves map segment progress u in [0, 1] to [0, 1]
+EASINGS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'linear': lambda u: u,
+    'hold': lambda u: np.zeros_like(u),
+    'quad_in': lambda u: u * u,
+    'quad_out': lambda u: u * (2 - u),
+    'quad_in_out': lambda u: np.where(u < 0.5, 2 * u * u, 1 - 2 * (1 - u) ** 2),
+    'sine_in_out': lambda u: (1 - np.cos(np.pi * u)) / 2,
+}
+
+
+@dataclass(frozen=True)
+class Keyframes:
+    """
+    Channel values at points of animation progress (0 = first frame, 1 = loop end)
+    Each key is (time, value, easing); the easing shapes the segment up to
+    the next key. Two keys at the same time make an instant jump.
+    """
+    keys: Tuple[Tuple[float, float, str], ...]
+
+    def __post_init__(self):
+        if len(self.keys) < 2:
+            raise ValueError("Keyframes need at least two keys")
+        for _, _, easing in self.keys:
+            if easing not in EASINGS:
+                raise ValueError(f"Unknown easing: {easing}")
+
+    def evaluate(self, progress: np.ndarray, index: np.ndarray) -> np.ndarray:
+        times = np.array([key[0] for key in self.keys], dtype=float)
+        values = np.array([key[1] for key in self.keys], dtype=float)
+        easings = np.array([key[2] for key in self.keys])
+
+        # The last key at or before each frame starts its segment
+        segment = np.clip(np.searchsorted(times, progress, side='right') - 1, 0, len(times) - 2)
+        start, span = times[segment], times[segment + 1] - times[segment]
+        u = np.divide(progress - start, span, out=np.ones_like(progress), where=span > 0)
+        u = np.clip(u, 0.0, 1.0)
+
+        eased = np.empty_like(u)
+        for easing in set(easings[segment]):
+            mask = easings[segment] == easing
+            eased[mask] = EASINGS[easing](u[mask])
+
+        return values[segment] + (values[segment + 1] - values[segment]) * eased
+
+
+@dataclass(frozen=True)
+class Alternate:
+    """Channel that steps through values frame by frame, e.g. a shake"""
+    values: Tuple[float, ...]
+
+    def evaluate(self, progress: np.ndarray, index: np.ndarray) -> np.ndarray:
+        return np.array(self.values, dtype=float)[index % len(self.values)]
+
+
+Channel = Union[Keyframes, Alternate]
+
+
+@dataclass(frozen=True)
+class TransformSpec:
+    """
+    Motion of one animation as channels over progress
+    Missing channels keep their defaults. With preserve_area, scale_y is
+    derived as 1 / scale_x (squash and stretch).
+    """
+    channels: Dict[str, Channel]
+    preserve_area: bool = False
+
+    def __post_init__(self):
+        unknown = set(self.channels) - set(CHANNELS)
+        if unknown:
+            raise ValueError(f"Unknown transform channels: {', '.join(sorted(unknown))}")
+
+
+def keys(*points) -> Keyframes:
+    """Keyframes from (time, value) or (time, value, easing) points; easing defaults to linear"""
+    return Keyframes(tuple((float(p[0]), float(p[1]), p[2] if len(p) > 2 else 'linear') for p in points))
+
+
+_breathe_scale = keys((0, 1.1), (0.5, 1.0), (1, 1.1))
+
+TRANSFORMS: Dict[str, TransformSpec] = {
+    # Idle breathing: gentle scale pulsing
+    'breathe': TransformSpec({'scale_x': _breathe_scale, 'scale_y': _breathe_scale}),
+    # Walking: bob and lean from side to side
+    'walk_cycle': TransformSpec({
+        'dy': keys((0, 5), (0.5, 0), (1, 5)),
+        'rotation': keys((0, -3), (1, 3)),
+    }),
+    # Jumping: parabolic arc with squash at take-off and landing
+    'jump_arc': TransformSpec({
+        'dy': keys((0, 0, 'quad_out'), (0.5, -50, 'quad_in'), (1, 0)),
+        'scale_x': keys((0, 0.9), (0.5, 1.0), (1, 0.9)),
+    }, preserve_area=True),
+    # Happy bouncing with rotation
+    'bounce_rotate': TransformSpec({
+        'dy': keys((0, -15), (0.5, 0), (1, -15)),
+        'rotation': keys((0, -10), (1, 10)),
+    }),
+    # Being petted: gentle side sway
+    'gentle_sway': TransformSpec({'rotation': keys((0, -5), (1, 5))}),
+    # Sleeping: rotate and fade
+    'sleep_fade': TransformSpec({
+        'rotation': keys((0, 0), (1, -30)),
+        'alpha': keys((0, 1.0), (1, 0.5)),
+    }),
+    # Eating: up-down chewing motion
+    'chew': TransformSpec({
+        'dy': keys((0, 8), (0.5, 0), (1, 8)),
+        'scale_x': keys((0, 1.15), (0.5, 1.0), (1, 1.15)),
+    }, preserve_area=True),
+    # Attack: wind up, strike forward stretched, recover
+    'pounce': TransformSpec({
+        'dx': keys((0, 0), (0.3, -10), (0.3, 0), (0.7, 30), (1, 0)),
+        'rotation': keys((0, 0), (0.3, -15), (0.3, 0), (0.7, 15), (1, 0)),
+        'scale_x': keys((0, 1.0, 'hold'), (0.3, 1.3, 'hold'), (0.7, 1.0, 'hold'), (1, 1.0)),
+    }),
+    # Hurt: rapid shake
+    'shake': TransformSpec({'dx': Alternate((10, -10)), 'rotation': Alternate((5, -5))}),
+    # Death: fall and fade
+    'collapse': TransformSpec({
+        'rotation': keys((0, 0), (1, -90)),
+        'dy': keys((0, 0), (1, 30)),
+        'alpha': keys((0, 1.0), (1, 0.0)),
+    }),
+    # Default: simple bounce
+    'bounce': TransformSpec({'dy': keys((0, -10), (0.5, 0), (1, -10))}),
+}
+
+DEFAULT_TRANSFORM = 'bounce'
+
+
+def register_transform(name: str, spec: TransformSpec):
+    """Add or replace a named transform"""
+    TRANSFORMS[name] = spec
+
+
+def get_transform(name: str) -> TransformSpec:
+    """Registered transform, or the default bounce for unknown names"""
+    return TRANSFORMS.get(name, TRANSFORMS[DEFAULT_TRANSFORM])
+
+
+def describe_transform(name: str) -> Dict:
+    """JSON-serializable form of a transform, e.g. for cache keys"""
+    return asdict(get_transform(name))
+
+
+def evaluate_transform(name: str, frames: int, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+    """
+    Motion parameters for frames [start, stop) of a `frames`-frame loop
+    Returns an (n, 6) float array with columns in CHANNELS order
+    """
+    spec = get_transform(name)
+    index = np.arange(start, frames if stop is None else stop)
+    progress = index / frames
+
+    params = np.empty((len(index), len(CHANNELS)))
+    for column, channel in enumerate(CHANNELS):
+        if channel in spec.channels:
+            values = spec.channels[channel].evaluate(progress, index)
+        else:
+            values = np.full(len(index), CHANNEL_DEFAULTS[channel])
+        if channel in INTEGER_CHANNELS:
+            # Snap float noise first so 19.999999999 becomes 20, not 19
+            values = np.trunc(np.round(values, 9))
+        params[:, column] = values
+
+    if spec.preserve_area:
+        params[:, 1] = 1.0 / params[:, 0]
+    return params
+
+
+def main():
+    """CLI entry point: print the per-frame parameters of a transform"""
+    if len(sys.argv) < 3:
+        print(f"Usage: python transforms.py <{'|'.join(TRANSFORMS)}> <frames>")
+        sys.exit(1)
+
+    params = evaluate_transform(sys.argv[1], int(sys.argv[2]))
+    print(json.dumps([dict(zip(CHANNELS, map(float, row))) for row in params], indent=2))
+
+
+if __name__ == "__main__":
+    main()
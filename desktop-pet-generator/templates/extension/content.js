@@ -277,6 +277,8 @@ function createPet() {
 
 // 移除宠物
 function removePet() {
+    stopFrameRects();
+
     if (petContainer) {
         petContainer.remove();
         petContainer = null;
@@ -346,6 +348,87 @@ function resetPosition() {
     petContainer.style.top = yOffset + 'px';
 }
 
+// 多倍图：image-set 让浏览器按屏幕像素密度只下载需要的那一张
+function spriteUrl(sprite, density) {
+    const name = density === 1 ? sprite : sprite.replace(/(\.\w+)$/, `@${density}x$1`);
+    return `url(${chrome.runtime.getURL(name)})`;
+}
+
+function setSpriteImage(el, sprite, config) {
+    if (!config.densities) {
+        el.style.backgroundImage = spriteUrl(sprite, 1);
+        return;
+    }
+    const set = config.densities.map(d => `${spriteUrl(sprite, d)} ${d}x`).join(', ');
+    // 旧版 Safari 只支持带前缀的写法；浏览器不认识的值会被忽略
+    el.style.backgroundImage = `-webkit-image-set(${set})`;
+    el.style.backgroundImage = `image-set(${set})`;
+}
+
+// 图集和网格模式：按 frame_rects 逐帧切换背景位置
+let frameTimer = null;
+
+function stopFrameRects() {
+    if (frameTimer) {
+        clearInterval(frameTimer);
+        frameTimer = null;
+    }
+}
+
+function pingPongOrder(count) {
+    const order = [];
+    for (let i = 0; i < count; i++) order.push(i);
+    for (let i = count - 2; i > 0; i--) order.push(i);
+    return order;
+}
+
+// 网格布局：按行列推算每一帧在图中的位置
+function gridRects(config) {
+    const grid = config.grid;
+    const rects = [];
+    for (let i = 0; i < grid.cells; i++) {
+        rects.push({
+            sprite: config.sprite,
+            x: (i % grid.columns) * grid.cell_width,
+            y: Math.floor(i / grid.columns) * grid.cell_height,
+            w: grid.cell_width,
+            h: grid.cell_height
+        });
+    }
+    return rects;
+}
+
+function playFrameRects(spriteImg, config) {
+    const rects = config.frame_rects || gridRects(config);
+    // 去重后的帧：按 frame_sequence 或往返（pingpong）顺序播放
+    const order = config.frame_sequence ||
+        (config.pingpong ? pingPongOrder(rects.length) : rects.map((_, i) => i));
+    const interval = (config.duration || 0.8) * 1000 / order.length;
+    const frameWidth = config.frame_width;
+    const frameHeight = config.frame_height || config.frame_width;
+    let index = 0;
+
+    const showFrame = () => {
+        const rect = rects[order[index]];
+        const left = rect.ox || 0;
+        const top = rect.oy || 0;
+        // 裁剪过的帧：用内边距把内容放回原帧格中的位置，外框尺寸不变
+        spriteImg.style.width = rect.w + 'px';
+        spriteImg.style.height = rect.h + 'px';
+        spriteImg.style.padding = `${top}px ${frameWidth - left - rect.w}px ${frameHeight - top - rect.h}px ${left}px`;
+        setSpriteImage(spriteImg, rect.sprite, config);
+        spriteImg.style.backgroundPosition = `-${rect.x}px -${rect.y}px`;
+        index = (index + 1) % order.length;
+    };
+
+    spriteImg.style.boxSizing = 'content-box';
+    spriteImg.style.backgroundClip = 'content-box';
+    spriteImg.style.backgroundOrigin = 'content-box';
+    spriteImg.style.animation = 'none';
+    showFrame();
+    frameTimer = setInterval(showFrame, interval);
+}
+
 // 动画切换功能
 function switchAnimation(type) {
     if (!petContainer) return;
@@ -358,7 +441,22 @@ function switchAnimation(type) {
     const spriteImg = petContainer.querySelector('#pet-sprite');
     if (!spriteImg) return;
 
-    spriteImg.style.backgroundImage = `url(${chrome.runtime.getURL(config.sprite)})`;
+    stopFrameRects();
+
+    if (config.frame_rects || config.grid) {
+        playFrameRects(spriteImg, config);
+        currentAnimation = type;
+        console.log('切换动画:', type, config);
+        return;
+    }
+
+    setSpriteImage(spriteImg, config.sprite, config);
+    spriteImg.style.backgroundPosition = '';
+    spriteImg.style.width = config.frame_width + 'px';
+    spriteImg.style.height = (config.frame_height || config.frame_width) + 'px';
+    spriteImg.style.padding = '0';
+    spriteImg.style.backgroundClip = '';
+    spriteImg.style.backgroundOrigin = '';
 
     const duration = config.duration || 0.8;
     const frames = config.frames || 1;
@@ -4,12 +4,34 @@ Smart Desktop Pet Creator - One-command pet generation
 Analyzes image, infers parameters, generates complete pet system, and starts preview
 """
 import sys
-import os
 import argparse
+import socket
 import subprocess
 import json
 from pathlib import Path
-import tempfile
+
+# pet_generator.py lives in the desktop-pet-generator skill: installed next
+# to this skill, or inside it in a source checkout
+PET_GENERATOR_DIRS = [
+    Path(__file__).parent.parent.parent / "desktop-pet-generator" / "scripts",
+    Path(__file__).parent.parent / "desktop-pet-generator" / "scripts",
+]
+
+def load_pet_generator():
+    """Import the pet_generator module from the desktop-pet-generator skill"""
+    for scripts_dir in PET_GENERATOR_DIRS:
+        if (scripts_dir / "pet_generator.py").exists():
+            sys.path.insert(0, str(scripts_dir))
+            import pet_generator
+            return pet_generator
+    print(f"❌ Error: pet_generator.py not found in {', '.join(str(d) for d in PET_GENERATOR_DIRS)}")
+    sys.exit(1)
+
+def port_in_use(port: int) -> bool:
+    """True if something already accepts connections on localhost:port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        return sock.connect_ex(('127.0.0.1', port)) == 0
 
 def analyze_image_with_ai(image_path: str) -> dict:
     """
@@ -50,57 +72,46 @@ def generate_pet(image_path: str, name: str = None, animations: str = None, outp
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Get the pet_generator.py path
-    pet_gen_path = Path(__file__).parent.parent.parent / "desktop-pet-generator" / "scripts" / "pet_generator.py"
-
-    if not pet_gen_path.exists():
-        print(f"❌ Error: pet_generator.py not found at {pet_gen_path}")
-        sys.exit(1)
-
-    # Run pet generator
+    # Run pet generator in this process
+    pet_generator = load_pet_generator()
     print(f"\n🎨 Generating desktop pet...")
     print(f"   Name: {name}")
     print(f"   Animations: {animations}")
     print(f"   Output: {output_dir}")
 
-    cmd = [
-        'python3',
-        str(pet_gen_path),
-        '--image', image_path,
-        '--name', name,
-        '--animations', animations,
-        '--output', str(output_dir)
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        print(f"❌ Generation failed:")
-        print(result.stderr)
+    try:
+        pet = pet_generator.generate(image_path, output=output_dir, name=name, animations=animations)
+    except Exception as e:
+        print(f"❌ Generation failed: {e}")
         sys.exit(1)
 
-    print(result.stdout)
-
     # Start preview server
     print(f"\n🌐 Starting preview server...")
 
     # Check if server is already running on port 8080
-    check_port = subprocess.run(['lsof', '-i', ':8080'], capture_output=True)
-
-    if check_port.returncode == 0:
+    if port_in_use(8080):
         print("⚠️  Server already running on port 8080")
         port = 8080
     else:
-        # Start HTTP server in background
-        os.chdir(output_dir)
+        # The server has to outlive this script, so it stays a background process
         server_process = subprocess.Popen(
-            ['python3', '-m', 'http.server', '8080'],
+            [sys.executable, '-m', 'http.server', '8080', '--directory', str(output_dir)],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
         port = 8080
         print(f"✅ Server started on port {port}")
 
+    result_info = {
+        'success': True,
+        'output_dir': str(output_dir),
+        'name': name,
+        'animations': animations,
+        'artifacts': [str(path) for path in pet.artifacts],
+        'seconds': pet.seconds,
+        'timings': pet.timings
+    }
+
     # Export port
     export_script = Path('/app/export-port.sh')
     if export_script.exists():
@@ -117,24 +128,13 @@ def generate_pet(image_path: str, name: str = None, animations: str = None, outp
             print(f"   • Long-press for pet animation with hearts")
             print(f"   • Right-click for menu")
 
-            return {
-                'success': True,
-                'output_dir': str(output_dir),
-                'preview_url': preview_url,
-                'name': name,
-                'animations': animations
-            }
+            return {**result_info, 'preview_url': preview_url}
 
     print(f"\n✨ Desktop pet generated successfully!")
     print(f"📁 Location: {output_dir}")
     print(f"💡 Open {output_dir}/index.html in your browser")
 
-    return {
-        'success': True,
-        'output_dir': str(output_dir),
-        'name': name,
-        'animations': animations
-    }
+    return result_info
 
 def main():
     parser = argparse.ArgumentParser(